@@ -5,7 +5,6 @@ import warnings
 from sys import maxsize
 import json
 import enemy_info
-import copy
 
 """
 Most of the algo code you write will be in this file unless you create new
@@ -71,7 +70,7 @@ class AlgoStrategy(gamelib.AlgoCore):
 
         self.starter_strategy(game_state)
 
-        self.prev_game_state = copy.deepcopy(game_state)
+        self.prev_game_state = game_state.snapshot()
         game_state.submit_turn()
 
 
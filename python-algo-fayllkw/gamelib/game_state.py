@@ -6,6 +6,7 @@ from .navigation import ShortestPathFinder
 from .util import send_command, debug_write
 from .unit import GameUnit
 from .game_map import GameMap
+from .snapshot import TurnSnapshot
 
 def is_stationary(unit_type):
     """
@@ -528,6 +529,29 @@ class GameState:
         self.enable_warnings = not suppress
         self.game_map.enable_warnings = not suppress
 
+    def snapshot(self):
+        """Records the structures, health, resources and turn number of this GameState in a small read only TurnSnapshot.
+        Use it instead of copy.deepcopy to remember the previous turn, the config is shared instead of copied.
+
+        Returns:
+            A TurnSnapshot
+
+        """
+        return TurnSnapshot(self)
+
+    def diff(self, previous, player_index=None):
+        """Finds the structures built, destroyed, upgraded and damaged since an earlier snapshot
+
+        Args:
+            previous: A TurnSnapshot taken with snapshot(), for example at the end of the previous turn
+            player_index: Only report this player's structures, both players if None
+
+        Returns:
+            A SnapshotDiff with the locations of each kind of change
+
+        """
+        return self.snapshot().diff(previous, player_index)
+
     def get_target(self, attacking_unit):
         """Returns target of given unit based on current map of the game board. 
         A Unit can often have many other units in range, and Units that attack do so once each frame.
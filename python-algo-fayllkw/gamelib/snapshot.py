@@ -0,0 +1,151 @@
+from array import array
+
+ARENA_SIZE = 28
+TILE_COUNT = ARENA_SIZE * ARENA_SIZE
+
+
+def _tile_indices(mask):
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class TurnSnapshot:
+    """A compact, read only record of a GameState, to keep the previous turn around without copying the whole state.
+
+    The stationary units are copied into flat arrays indexed by x * ARENA_SIZE + y, the config is shared by reference
+    and information units are left out. Take one with GameState.snapshot() at the end of on_turn and compare the next turn's
+    state against it with GameState.diff().
+
+    Attributes :
+        * config (JSON): The config the state was built with
+        * turn_number (int): The turn number of the state
+        * health (tuple): (my_health, enemy_health)
+        * resources (tuple): ((cores, bits) of player 0, (cores, bits) of player 1)
+        * unit_types (tuple): The unit types, unit_type[index] is an index into it
+        * unit_type (memoryview): The index in unit_types of the stationary unit on each tile, -1 if there is none
+        * owner (memoryview): The player_index of the stationary unit on each tile, -1 if there is none
+        * unit_health (memoryview): The health of the stationary unit on each tile
+        * upgraded (memoryview): 1 if the stationary unit on the tile is upgraded
+        * structures (int): A bitmask of the tiles holding a stationary unit, bit x * ARENA_SIZE + y is set if [x, y] holds one
+
+    """
+    __slots__ = ("config", "turn_number", "health", "resources", "unit_types", "unit_type", "owner",
+                 "unit_health", "upgraded", "structures", "_frozen")
+
+    def __init__(self, game_state):
+        """ Copies the board and resources of a GameState
+
+        Args:
+            * game_state (:obj: GameState): The state to record
+
+        """
+        self.config = game_state.config
+        self.turn_number = game_state.turn_number
+        self.health = (game_state.my_health, game_state.enemy_health)
+        self.resources = (tuple(game_state.get_resources(0)), tuple(game_state.get_resources(1)))
+        self.unit_types = tuple(unit_info["shorthand"] for unit_info in self.config["unitInformation"])
+        type_index = {unit_type: index for index, unit_type in enumerate(self.unit_types)}
+        unit_type = array('b', [-1]) * TILE_COUNT
+        owner = array('b', [-1]) * TILE_COUNT
+        unit_health = array('d', [0.0]) * TILE_COUNT
+        upgraded = bytearray(TILE_COUNT)
+        structures = 0
+        game_map = game_state.game_map
+        # GameMap is its own iterator, so walk a copy of the locations
+        for x, y in list(game_map):
+            for unit in game_map[x, y]:
+                if unit.stationary:
+                    index = x * ARENA_SIZE + y
+                    unit_type[index] = type_index[unit.unit_type]
+                    owner[index] = unit.player_index
+                    unit_health[index] = unit.health
+                    upgraded[index] = unit.upgraded
+                    structures |= 1 << index
+        self.unit_type = memoryview(unit_type).toreadonly()
+        self.owner = memoryview(owner).toreadonly()
+        self.unit_health = memoryview(unit_health).toreadonly()
+        self.upgraded = memoryview(bytes(upgraded))
+        self.structures = structures
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("TurnSnapshot is read only")
+        super().__setattr__(name, value)
+
+    def unit_at(self, location):
+        """The stationary unit recorded at a location
+
+        Args:
+            location: The [x, y] location to look at
+
+        Returns:
+            A (unit_type, player_index, health, upgraded) tuple, or None if the tile was empty
+        """
+        index = location[0] * ARENA_SIZE + location[1]
+        if self.unit_type[index] < 0:
+            return None
+        return (self.unit_types[self.unit_type[index]], self.owner[index], self.unit_health[index], bool(self.upgraded[index]))
+
+    def diff(self, previous, player_index=None):
+        """Compares this snapshot with an earlier one, see SnapshotDiff
+
+        Args:
+            previous: The earlier TurnSnapshot
+            player_index: Only report this player's structures, both players if None
+
+        Returns:
+            A SnapshotDiff
+        """
+        return SnapshotDiff(previous, self, player_index)
+
+
+class SnapshotDiff:
+    """The structures that changed between two TurnSnapshots.
+    A tile whose unit changed type or owner counts as destroyed and built. A unit that was upgraded is not also reported as damaged.
+
+    Attributes :
+        * before (:obj: TurnSnapshot): The earlier snapshot
+        * after (:obj: TurnSnapshot): The later snapshot
+        * built (list): The [x, y] locations of structures in after that were not in before
+        * destroyed (list): The [x, y] locations of structures in before that are not in after
+        * upgraded (list): The [x, y] locations of structures upgraded in between
+        * damaged (list): The [x, y] locations of structures that lost health in between
+        * health_lost (dict): Maps the tile index, x * ARENA_SIZE + y, of each damaged location to the health it lost
+
+    """
+    def __init__(self, before, after, player_index=None):
+        """ Compares the tiles that held a structure in either snapshot
+
+        Args:
+            * before (:obj: TurnSnapshot): The earlier snapshot
+            * after (:obj: TurnSnapshot): The later snapshot
+            * player_index (int): Only report this player's structures, both players if None
+
+        """
+        self.before = before
+        self.after = after
+        self.built = []
+        self.destroyed = []
+        self.upgraded = []
+        self.damaged = []
+        self.health_lost = {}
+        for index in _tile_indices(before.structures | after.structures):
+            old_owner, new_owner = before.owner[index], after.owner[index]
+            if player_index is not None and player_index not in (old_owner, new_owner):
+                continue
+            location = list(divmod(index, ARENA_SIZE))
+            old_type, new_type = before.unit_type[index], after.unit_type[index]
+            if old_type < 0 or new_type < 0 or old_owner != new_owner or \
+                    before.unit_types[old_type] != after.unit_types[new_type]:
+                if old_type >= 0 and player_index in (None, old_owner):
+                    self.destroyed.append(location)
+                if new_type >= 0 and player_index in (None, new_owner):
+                    self.built.append(location)
+            elif after.upgraded[index] and not before.upgraded[index]:
+                self.upgraded.append(location)
+            elif after.unit_health[index] < before.unit_health[index]:
+                self.damaged.append(location)
+                self.health_lost[index] = before.unit_health[index] - after.unit_health[index]
@@ -3,6 +3,23 @@ import json
 from .game_state import GameState
 from .unit import GameUnit
 
+SNAPSHOT_CONFIG = {
+    "unitInformation": [
+        {"shorthand": "FF", "unitCategory": 0, "startHealth": 60.0, "cost1": 1.0, "getHitRadius": 0.01},
+        {"shorthand": "EF", "unitCategory": 0, "startHealth": 30.0, "cost1": 4.0, "shieldRange": 3.5},
+        {"shorthand": "DF", "unitCategory": 0, "startHealth": 75.0, "cost1": 6.0, "attackRange": 3.5,
+         "attackDamageWalker": 16.0, "upgrade": {"attackDamageWalker": 32.0}},
+        {"shorthand": "PI", "unitCategory": 1, "startHealth": 15.0, "cost2": 1.0, "speed": 1},
+        {"shorthand": "EI", "unitCategory": 1, "startHealth": 5.0, "cost2": 3.0, "speed": 0.5},
+        {"shorthand": "SI", "unitCategory": 1, "startHealth": 40.0, "cost2": 1.0, "speed": 0.25},
+        {"shorthand": "RM"},
+        {"shorthand": "UP"}
+    ]
+}
+
+SNAPSHOT_TURN = {"p2Units": [[], [], [], [], [], [], [], []], "turnInfo": [0, 0, -1], "p1Stats": [30.0, 40.0, 5.0, 0],
+                 "p1Units": [[], [], [], [], [], [], [], []], "p2Stats": [28.0, 40.0, 5.0, 0], "events": {}}
+
 class BasicTests(unittest.TestCase):
 
     def make_turn_0_map(self):
@@ -232,3 +249,49 @@ class BasicTests(unittest.TestCase):
         actual = game.project_future_bits(turns)
         self.assertAlmostEqual(actual, expected, 0, "Expected {} bits {} turns from now, got {}".format(expected, turns, actual))
 
+
+class SnapshotTests(unittest.TestCase):
+
+    def make_turn(self, turn_number, p1_units, p2_units):
+        turn = json.loads(json.dumps(SNAPSHOT_TURN))
+        turn["turnInfo"] = [0, turn_number, -1]
+        for units, placed in (("p1Units", p1_units), ("p2Units", p2_units)):
+            for type_index, x, y, health in placed:
+                turn[units][type_index].append([x, y, health, ""])
+        state = GameState(SNAPSHOT_CONFIG, json.dumps(turn))
+        state.suppress_warnings(True)
+        return state
+
+    def test_snapshot_is_read_only_record(self):
+        game = self.make_turn(3, [(2, 13, 11, 60), (3, 13, 0, 15)], [])
+        snapshot = game.snapshot()
+        self.assertEqual(3, snapshot.turn_number)
+        self.assertEqual((30.0, 28.0), snapshot.health)
+        self.assertEqual(((40.0, 5.0), (40.0, 5.0)), snapshot.resources)
+        self.assertEqual(("DF", 0, 60, False), snapshot.unit_at([13, 11]))
+        self.assertIsNone(snapshot.unit_at([13, 0]), "Information units are not recorded")
+        self.assertEqual(1 << (13 * 28 + 11), snapshot.structures)
+        self.assertIs(game.config, snapshot.config)
+        with self.assertRaises(AttributeError):
+            snapshot.turn_number = 4
+        with self.assertRaises(TypeError):
+            snapshot.unit_type[0] = 1
+
+        game.game_map.remove_unit([13, 11])
+        self.assertEqual(("DF", 0, 60, False), snapshot.unit_at([13, 11]), "Later changes do not reach the snapshot")
+
+    def test_diff(self):
+        previous = self.make_turn(1, [(2, 13, 11, 75), (0, 12, 11, 60), (0, 11, 11, 60)], [(0, 14, 16, 60), (1, 15, 16, 30)])
+        snapshot = previous.snapshot()
+        current = self.make_turn(2, [(2, 13, 11, 75), (7, 13, 11, 0), (0, 12, 11, 40), (0, 10, 11, 60)], [(2, 15, 16, 75)])
+
+        diff = current.diff(snapshot)
+        self.assertEqual([[10, 11], [15, 16]], sorted(diff.built))
+        self.assertEqual([[11, 11], [14, 16], [15, 16]], sorted(diff.destroyed))
+        self.assertEqual([[13, 11]], diff.upgraded)
+        self.assertEqual([[12, 11]], diff.damaged)
+        self.assertEqual({12 * 28 + 11: 20}, diff.health_lost)
+
+        mine = current.diff(snapshot, player_index=0)
+        self.assertEqual([[10, 11]], mine.built)
+        self.assertEqual([[11, 11]], mine.destroyed)
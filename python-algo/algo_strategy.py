@@ -15,13 +15,22 @@ Advanced strategy tips:
   - You can analyze action frames by modifying on_action_frame function
 
   - The GameState.map object can be manually manipulated to create hypothetical 
-  board states. Though, we recommended making a copy of the map to preserve 
-  the actual current map state.
+  board states. Though, we recommended working on game_state.fork() to preserve 
+  the actual current map state, forks are cheap and share unchanged locations.
+  To ask what a few extra structures would change, game_state.overlay() places
+  them only for the duration of a with block.
 """
 
 class AlgoStrategy(gamelib.AlgoCore):
     def __init__(self):
         super().__init__()
+        # Receive turns already decoded, and action frames as ActionFrames that only decode the events we read
+        self.parsed_messages = True
+        self.lazy_frames = True
+        self.frame_events = ["breach"]
+        # Set to True to pick ping spawn locations by simulating them on a process pool, see on_game_start
+        self.use_plan_evaluator = False
+        self.plan_evaluator = None
         seed = random.randrange(maxsize)
         random.seed(seed)
         gamelib.debug_write('Random seed: {}'.format(seed))
@@ -62,6 +71,20 @@ class AlgoStrategy(gamelib.AlgoCore):
         self.frontier = [(x, 15-math.ceil(EMP_INFO.attackRange)) for x in range(7, 21)]
         # self.left_corner =
 
+        # Paths are reused across turns for as long as the walls they were found on are unchanged
+        self.path_cache = gamelib.PathCache()
+
+        # Starting the processes is slow, so the pool is started once here and kept for the whole game
+        if self.use_plan_evaluator:
+            self.plan_evaluator = gamelib.PlanEvaluator(config)
+
+    def start(self):
+        try:
+            super().start()
+        finally:
+            if self.plan_evaluator is not None:
+                self.plan_evaluator.close()
+
     def get_unit_info(self):
         type_config = self.config["unitInformation"][0]
         self.stationary = type_config["unitCategory"] == 0
@@ -85,6 +108,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         game_state = gamelib.GameState(self.config, turn_state)
         gamelib.debug_write('Performing turn {} of your custom algo strategy'.format(game_state.turn_number))
         game_state.suppress_warnings(True)  #Comment or remove this line to enable warnings.
+        game_state.path_cache = self.path_cache
 
         self.starter_strategy(game_state)
 
@@ -276,15 +300,12 @@ class AlgoStrategy(gamelib.AlgoCore):
         estimate the path's damage risk.
         """
         damages = []
-        # Get the damage estimate each path will take
-        for location in location_options:
-            path = game_state.find_path_to_edge(location)
-            damage = 0
-            for path_location in path:
-                # Get number of enemy destructors that can attack the final location and multiply by destructor damage
-                damage += len(game_state.get_attackers(path_location, 0)) * gamelib.GameUnit(DESTRUCTOR,
-                                                                                             game_state.config).damage_i
-            damages.append(damage)
+        # Get the damage estimate each path will take, pathing every option in one batch
+        paths = game_state.find_paths_to_edge_batch(location_options)
+        threat_map = game_state.get_threat_map()
+        for path in paths:
+            # Sum the damage per frame the enemy structures in range of each tile can deal, upgrades included
+            damages.append(threat_map.path_damage(path, 0))
 
         # Now just return the location that takes the least damage
         return damages
@@ -349,6 +370,10 @@ class AlgoStrategy(gamelib.AlgoCore):
                     best_location = ping_spawn_location_options[damages.index(min(damages))]
                 # best_location = self.least_damage_spawn_location(game_state, ping_spawn_location_options)
                     if game_state.number_affordable(PING) >= 15:
+                        if self.plan_evaluator is not None:
+                            # Simulate the action phase from each option instead of trusting the path damage estimate
+                            candidates = gamelib.PlanEvaluator.plan_grid([PING], ping_spawn_location_options, [game_state.number_affordable(PING)])
+                            best_location = self.plan_evaluator.best(game_state, candidates)[0][1]
                         game_state.attempt_spawn(PING, best_location, 1000)
 
 
@@ -528,26 +553,23 @@ class AlgoStrategy(gamelib.AlgoCore):
         estimate the path's damage risk.
         """
         damages = []
-        # Get the damage estimate each path will take
-        for location in location_options:
-            path = game_state.find_path_to_edge(location)
-            damage = 0
-            for path_location in path:
-                # Get number of enemy destructors that can attack the final location and multiply by destructor damage
-                damage += len(game_state.get_attackers(path_location, 0)) * gamelib.GameUnit(DESTRUCTOR, game_state.config).damage_i
-            damages.append(damage)
+        # Get the damage estimate each path will take, pathing every option in one batch
+        paths = game_state.find_paths_to_edge_batch(location_options)
+        threat_map = game_state.get_threat_map()
+        for path in paths:
+            # Sum the damage per frame the enemy structures in range of each tile can deal, upgrades included
+            damages.append(threat_map.path_damage(path, 0))
         
         # Now just return the location that takes the least damage
         return location_options[damages.index(min(damages))]
 
     def detect_enemy_unit(self, game_state, unit_type=None, valid_x = None, valid_y = None):
-        total_units = 0
-        for location in game_state.game_map:
-            if game_state.contains_stationary_unit(location):
-                for unit in game_state.game_map[location]:
-                    if unit.player_index == 1 and (unit_type is None or unit.unit_type == unit_type) and (valid_x is None or location[0] in valid_x) and (valid_y is None or location[1] in valid_y):
-                        total_units += 1
-        return total_units
+        region = gamelib.arena.ARENA_MASK
+        if valid_x is not None or valid_y is not None:
+            xs = range(game_state.ARENA_SIZE) if valid_x is None else valid_x
+            ys = range(game_state.ARENA_SIZE) if valid_y is None else valid_y
+            region = gamelib.arena.region_mask([[x, y] for x in xs for y in ys])
+        return game_state.game_map.get_arrays().count(region, unit_type, 1)
         
     def filter_blocked_locations(self, locations, game_state):
         filtered = []
@@ -556,7 +578,7 @@ class AlgoStrategy(gamelib.AlgoCore):
                 filtered.append(location)
         return filtered
 
-    def on_action_frame(self, turn_string):
+    def on_action_frame(self, frame):
         """
         This is the action frame of the game. This function could be called 
         hundreds of times per turn and could slow the algo down so avoid putting slow code here.
@@ -564,9 +586,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         Full doc on format of a game frame at: https://docs.c1games.com/json-docs.html
         """
         # Let's record at what position we get scored on
-        state = json.loads(turn_string)
-        events = state["events"]
-        breaches = events["breach"]
+        breaches = frame.events.breach
         for breach in breaches:
             location = breach[0]
             unit_owner_self = True if breach[4] == 1 else False
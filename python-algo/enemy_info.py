@@ -5,7 +5,9 @@ Created by zhenlinx on 1/31/20
 """
 
 from collections import defaultdict, Counter
+import functools
 import gamelib
+from gamelib import arena
 
 
 def vertical_mirror(points):
@@ -42,6 +44,47 @@ RIGHT_CORNER = [[23, 18], [23, 17], [24, 17], [23, 16], [24, 16], [25, 16],
                 [23, 15], [24, 15], [25, 15], [26, 15], [23, 14], [24, 14],
                 [25, 14], [26, 14], [27, 14]]  # side length = 5
 FRONTIER = [[i, j] for i in range(7, 21) for j in range(14, 19)]
+ENEMY_HALF = [[x, y] for x in range(28) for y in range(14, 28)]
+
+
+# Regions are int masks over the arena, bit arena.tile_index(x, y) is set for every tile in the region,
+# so counting units of a type in a region is a popcount of the region & the type's placement mask.
+REGIONS = {}
+LIST_MASK_CACHE_SIZE = 256
+
+
+def register_region(name, locations):
+    """ Register a named region so that it can be passed to the detect functions by name. Returns its mask. """
+    REGIONS[name] = arena.region_mask(locations)
+    return REGIONS[name]
+
+
+def region_mask(region):
+    """
+    Return the mask of a region given as a registered name, a mask, or a list of locations.
+    The masks of the last LIST_MASK_CACHE_SIZE lists seen are cached, register regions used every turn instead.
+    """
+    if isinstance(region, int):
+        return region
+    if isinstance(region, str):
+        return REGIONS[region]
+    return _list_mask(tuple(map(tuple, region)))
+
+
+@functools.lru_cache(maxsize=LIST_MASK_CACHE_SIZE)
+def _list_mask(locations):
+    return arena.region_mask(locations)
+
+
+register_region("left_corner", LEFT_CORNER)
+register_region("right_corner", RIGHT_CORNER)
+register_region("frontier", FRONTIER)
+register_region("enemy_half", ENEMY_HALF)
+for i, edge in enumerate(LEFT_EDGES):
+    register_region("left_edge_{}".format(i), edge)
+for i, edge in enumerate(RIGHT_EDGES):
+    register_region("right_edge_{}".format(i), edge)
+FRONTIER_ROWS = {row: arena.region_mask([loc for loc in FRONTIER if loc[1] == row]) for row in range(14, 19)}
 
 
 class EnemyState:
@@ -52,20 +95,21 @@ class EnemyState:
         self.game_state = game_state
         # self.defence_units = defaultdict(list)  # TODO: not sure if we need to store all the unit information
         self.defence_locs = defaultdict(list)  # key: type, value: list of locs
+        self.defence_masks = {}  # key: type, value: mask of the tiles holding that type
         self.scanned = False
 
     def scan_def_units(self):
         """ Scan the enemy half and store locations of the stationary units. """
         # gamelib.debug_write("...Entering scan_def_units...")
+        arrays = self.game_state.game_map.get_arrays()
+        enemy_half = REGIONS["enemy_half"]
         self.total_units = 0
-        for location in self.game_state.game_map:
-            if location[1] < 14:  # still in our half
-                continue
-            for unit in self.game_state.game_map[location]:
-                if unit.player_index == 1 and unit.stationary:
-                    self.total_units += 1
-                    self.defence_locs[unit.unit_type].append(location)
-                    # self.defence_units[unit.unit_type].append(unit)
+        for unit_type in self.game_state.FIREWALL_TYPES:
+            mask = arrays.stationary_mask(unit_type, 1) & enemy_half
+            if mask:
+                self.defence_masks[unit_type] = mask
+                self.defence_locs[unit_type] = arena.mask_locations(mask)
+                self.total_units += arena.popcount(mask)
         self.scanned = True
         # gamelib.debug_write("Scan Result:")
         # gamelib.debug_write("{}".format(self.defence_locs))
@@ -77,18 +121,18 @@ class EnemyState:
         a count of total units, and a count of total positions.
         If unit type is specified, the dict contains only 1 entry.
         If not, then dict contains info for all defense unit types.
+        target_area can be a list of locations, a region mask, or the name of a registered region.
         """
         if not self.scanned:
             self.scan_def_units()
+        area = region_mask(target_area)
         rtn = {}
-        for type, locs in self.defence_locs.items():
+        for type, mask in self.defence_masks.items():
             if unit_type != None and unit_type != type:
                 continue
-            rtn[type] = 0
-            for loc in locs:
-                if loc in target_area:
-                    rtn[type] += 1
-        return rtn, sum(rtn.values()), len(target_area)
+            rtn[type] = arena.popcount(mask & area)
+        positions = len(target_area) if isinstance(target_area, list) else arena.popcount(area)
+        return rtn, sum(rtn.values()), positions
 
     def detect_frontier(self, unit_type):
         """
@@ -98,20 +142,14 @@ class EnemyState:
         """
         if not self.scanned:
             self.scan_def_units()
-        total_counts = 0
-        count = 0
-        row_counts = {i: 0 for i in range(14, 19)}
-        for type, locs in self.defence_locs.items():
-            for point in locs:
-                if point in FRONTIER:
-                    total_counts += 1
-                    if type == unit_type:
-                        count += 1
-                        row_counts[point[1]] += 1
+        frontier = REGIONS["frontier"]
+        total_counts = sum(arena.popcount(mask & frontier) for mask in self.defence_masks.values())
+        type_mask = self.defence_masks.get(unit_type, 0)
+        count = arena.popcount(type_mask & frontier)
+        row_counts = {row: arena.popcount(type_mask & row_mask) for row, row_mask in FRONTIER_ROWS.items()}
         ctn = Counter(row_counts)
         row_with_most_units = ctn.most_common(1)[0]
         gamelib.debug_write("Total defense units in frontier: {}".format(total_counts))
         gamelib.debug_write("Total {} in frontier: {}".format(unit_type, count))
         gamelib.debug_write("Row {} has most {} ({})".format(row_with_most_units[0], unit_type, row_with_most_units[1]))
         return total_counts, count, row_with_most_units
-
@@ -16,6 +16,38 @@ Investigating it is useful for advanced players interested in getting data from
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
+arena.py contains static lookup tables describing the diamond shaped arena: which tiles are in bounds, tile indices and neighbors. \n
+
+The ThreatMap class in threat_map.py holds the per tile damage each player's structures can deal every frame. 
+Use GameState.get_threat_map() to estimate how much damage a path will take. \n
+
+The ActionSimulator class in simulator.py runs a deterministic, offline approximation of the action phase. 
+It can be used to compare candidate deploys before submitting a turn. \n
+
+The ActionFrame class in action_frame.py is a lazy view of an action frame that only decodes the parts you read, such as frame.events.breach. 
+Set lazy_frames on your algo to receive frames this way in on_action_frame. \n
+
+The TurnClock class in turn_clock.py tracks the time left in a turn. AlgoCore starts self.turn_clock when a turn arrives, 
+and TurnClock.run_anytime keeps trying candidate plans until the time limit is close, then submits the best one. \n
+
+The SpeculativePlanner class in speculation.py plans the next turn in a background thread during the action phase, 
+from the board predicted by the incoming frames, and hands the plan to on_turn if the board matches. \n
+
+The PlanEvaluator class in parallel.py keeps a pool of processes for the whole game and scores candidate plans on all cores. 
+Create it in on_game_start, it sends each GameState to the processes as a small StateSnapshot. \n
+
+The RuleSet class in rules.py holds the unit types and rules of a config, read once. GameState, GameMap and GameUnit share it, 
+so states from different configs can be used at the same time. \n
+
+The BoardArrays class in board.py is a struct of arrays view of the map, with per tile arrays and per type region masks. 
+Use GameMap.get_arrays() to count units in a region without walking the unit lists. \n
+
+The TurnSnapshot class in snapshot.py is a small read only record of a turn's structures, health and resources. 
+Keep GameState.snapshot() from the previous turn instead of a deepcopy and compare with GameState.diff(). \n
+
+The PathCache class in path_cache.py keeps the paths found by GameState.find_path_to_edge, keyed by the walls they were found on. 
+Set it as path_cache on each turn's GameState to reuse paths across calls and turns. \n
+
 util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
 """
 
@@ -24,6 +56,16 @@ from .util import debug_write
 from .game_state import GameState
 from .unit import GameUnit
 from .game_map import GameMap
+from .threat_map import ThreatMap
+from .simulator import ActionSimulator
+from .action_frame import ActionFrame
+from .turn_clock import TurnClock
+from .speculation import SpeculativePlanner
+from .parallel import PlanEvaluator
+from .rules import RuleSet
+from .board import BoardArrays
+from .snapshot import TurnSnapshot
+from .path_cache import PathCache
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["algocore", "arena", "game_state", "game_map", "navigation", "unit", "util", "threat_map", "simulator", "action_frame", "turn_clock", "speculation", "parallel", "rules", "board", "snapshot", "path_cache"]
  
\ No newline at end of file
@@ -0,0 +1,341 @@
+"""
+Shared fixtures for tests.py and benchmarks.py: a season config to build GameStates from and the original pathfinder
+as a reference implementation. Kept out of tests.py so the benchmarks do not load the test suite.
+"""
+
+import json
+import queue
+import random
+import sys
+
+from .game_state import GameState
+
+SEASON_CONFIG = """
+{
+        "debug": {
+            "printMapString": false,
+            "printTStrings": false,
+            "printActStrings": false,
+            "printHitStrings": false,
+            "printPlayerInputStrings": false,
+            "printBotErrors": true,
+            "printPlayerGetHitStrings": false
+        },
+        "unitInformation": [
+            {
+                "cost1": 0.5,
+                "getHitRadius": 0.01,
+                "display": "Filter",
+                "shorthand": "FF",
+                "startHealth": 6.0,
+                "unitCategory": 0,
+                "refundPercentage": 0.75,
+                "turnsRequiredToRemove": 1,
+                "upgrade": {
+                    "cost1": 1.5,
+                    "startHealth": 120.0
+                }
+            },
+            {
+                "cost1": 4.0,
+                "getHitRadius": 0.01,
+                "shieldPerUnit": 2.0,
+                "display": "Encryptor",
+                "shieldRange": 3.5,
+                "shorthand": "EF",
+                "startHealth": 30.0,
+                "unitCategory": 0,
+                "shieldBonusPerY": 0.25,
+                "refundPercentage": 0.75,
+                "shieldDecay": 0.0,
+                "turnsRequiredToRemove": 1,
+                "upgrade": {
+                    "shieldRange": 7,
+                    "shieldPerUnit": 3
+                }
+            },
+            {
+                "attackDamageWalker": 16.0,
+                "cost1": 6.0,
+                "getHitRadius": 0.01,
+                "display": "Destructor",
+                "attackRange": 3.5,
+                "shorthand": "DF",
+                "startHealth": 75.0,
+                "unitCategory": 0,
+                "refundPercentage": 0.75,
+                "turnsRequiredToRemove": 1,
+                "upgrade": {
+                    "attackDamageWalker": 32.0
+                }
+            },
+            {
+                "attackDamageTower": 2.0,
+                "attackDamageWalker": 2.0,
+                "playerBreachDamage": 1.0,
+                "cost2": 1.0,
+                "getHitRadius": 0.01,
+                "display": "Ping",
+                "attackRange": 3.5,
+                "shorthand": "PI",
+                "startHealth": 15.0,
+                "speed": 1,
+                "unitCategory": 1,
+                "selfDestructDamageWalker": 15.0,
+                "selfDestructDamageTower": 15.0,
+                "metalForBreach": 1.0,
+                "selfDestructRange": 1.5,
+                "selfDestructStepsRequired": 5
+            },
+            {
+                "attackDamageWalker": 8.0,
+                "attackDamageTower": 8.0,
+                "playerBreachDamage": 1.0,
+                "cost2": 3.0,
+                "getHitRadius": 0.01,
+                "display": "EMP",
+                "attackRange": 4.5,
+                "shorthand": "EI",
+                "startHealth": 5.0,
+                "speed": 0.5,
+                "unitCategory": 1,
+                "selfDestructDamageWalker": 5.0,
+                "selfDestructDamageTower": 5.0,
+                "metalForBreach": 1.0,
+                "selfDestructRange": 1.5,
+                "selfDestructStepsRequired": 5
+            },
+            {
+                "attackDamageWalker": 20.0,
+                "playerBreachDamage": 1.0,
+                "cost2": 1.0,
+                "getHitRadius": 0.01,
+                "display": "Scrambler",
+                "attackRange": 4.5,
+                "shorthand": "SI",
+                "startHealth": 40.0,
+                "speed": 0.25,
+                "unitCategory": 1,
+                "selfDestructDamageWalker": 40.0,
+                "selfDestructDamageTower": 0.0,
+                "metalForBreach": 1.0,
+                "selfDestructRange": 6,
+                "selfDestructStepsRequired": 0
+            },
+            {
+                "display": "Remove",
+                "shorthand": "RM"
+            },
+            {
+                "display": "Upgrade",
+                "shorthand": "UP"
+            }
+        ],
+        "timingAndReplay": {
+            "waitTimeBotMax": 35000,
+            "playWaitTimeBotMax": 40000,
+            "waitTimeManual": 1820000,
+            "waitForever": false,
+            "waitTimeBotSoft": 5000,
+            "playWaitTimeBotSoft": 10000,
+            "replaySave": 1,
+            "playReplaySave": 0,
+            "storeBotTimes": true,
+            "waitTimeStartGame": 3000,
+            "waitTimeEndGame": 3000
+        },
+        "resources": {
+            "turnIntervalForBitCapSchedule": 10,
+            "turnIntervalForBitSchedule": 10,
+            "bitRampBitCapGrowthRate": 5.0,
+            "roundStartBitRamp": 10,
+            "bitGrowthRate": 1.0,
+            "startingHP": 30.0,
+            "maxBits": 150.0,
+            "bitsPerRound": 5.0,
+            "coresPerRound": 5.0,
+            "coresForPlayerDamage": 1.0,
+            "startingBits": 5.0,
+            "bitDecayPerRound": 0.25,
+            "startingCores": 40.0
+        }
+    }
+"""
+
+EMPTY_TURN = """{"p2Units":[[],[],[],[],[],[],[],[]],"turnInfo":[0,0,-1],"p1Stats":[30.0,40.0,5.0,0],"p1Units":[[],[],[],[],[],[],[],[]],"p2Stats":[30.0,40.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
+
+
+def make_season_state(turn_string=EMPTY_TURN):
+    state = GameState(json.loads(SEASON_CONFIG), turn_string)
+    state.suppress_warnings(True)
+    return state
+
+
+def make_random_board(seed, density=0.3):
+    """Fills both halves of an empty board with filters at random"""
+    state = make_season_state()
+    rng = random.Random(seed)
+    for location in list(state.game_map):
+        if rng.random() < density:
+            state.game_map.add_unit("FF", location, 0 if location[1] < state.HALF_ARENA else 1)
+    return state
+
+
+class ReferencePathFinder:
+    """The original Node grid pathfinder, kept verbatim as an oracle for differential tests"""
+
+    class Node:
+        def __init__(self):
+            self.visited_idealness = False
+            self.visited_validate = False
+            self.blocked = False
+            self.pathlength = -1
+
+    HORIZONTAL = 1
+    VERTICAL = 2
+
+    def navigate_multiple_endpoints(self, start_point, end_points, game_state):
+        if game_state.contains_stationary_unit(start_point):
+            return
+        self.game_state = game_state
+        self.game_map = [[self.Node() for x in range(28)] for y in range(28)]
+        for location in self.game_state.game_map:
+            if self.game_state.contains_stationary_unit(location):
+                self.game_map[location[0]][location[1]].blocked = True
+        ideal_endpoints = self._idealness_search(start_point, end_points)
+        self._validate(ideal_endpoints, end_points)
+        return self._get_path(start_point, end_points)
+
+    def _idealness_search(self, start, end_points):
+        current = queue.Queue()
+        current.put(start)
+        best_idealness = self._get_idealness(start, end_points)
+        self.game_map[start[0]][start[1]].visited_idealness = True
+        most_ideal = start
+        while not current.empty():
+            search_location = current.get()
+            for neighbor in self._get_neighbors(search_location):
+                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+                    continue
+                x, y = neighbor
+                current_idealness = self._get_idealness(neighbor, end_points)
+                if current_idealness > best_idealness:
+                    best_idealness = current_idealness
+                    most_ideal = neighbor
+                if not self.game_map[x][y].visited_idealness and not self.game_map[x][y].blocked:
+                    self.game_map[x][y].visited_idealness = True
+                    current.put(neighbor)
+        return most_ideal
+
+    def _get_neighbors(self, location):
+        x, y = location
+        return [[x, y + 1], [x, y - 1], [x + 1, y], [x - 1, y]]
+
+    def _get_direction_from_endpoints(self, end_points):
+        x, y = end_points[0]
+        direction = [1, 1]
+        if x < 14:
+            direction[0] = -1
+        if y < 14:
+            direction[1] = -1
+        return direction
+
+    def _get_idealness(self, location, end_points):
+        if location in end_points:
+            return sys.maxsize
+        direction = self._get_direction_from_endpoints(end_points)
+        idealness = 0
+        if direction[1] == 1:
+            idealness += 28 * location[1]
+        else:
+            idealness += 28 * (27 - location[1])
+        if direction[0] == 1:
+            idealness += location[0]
+        else:
+            idealness += (27 - location[0])
+        return idealness
+
+    def _validate(self, ideal_tile, end_points):
+        current = queue.Queue()
+        if ideal_tile in end_points:
+            for location in end_points:
+                current.put(location)
+                self.game_map[location[0]][location[1]].pathlength = 0
+                self.game_map[location[0]][location[1]].visited_validate = True
+        else:
+            current.put(ideal_tile)
+            self.game_map[ideal_tile[0]][ideal_tile[1]].pathlength = 0
+            self.game_map[ideal_tile[0]][ideal_tile[1]].visited_validate = True
+        while not current.empty():
+            current_location = current.get()
+            current_node = self.game_map[current_location[0]][current_location[1]]
+            for neighbor in self._get_neighbors(current_location):
+                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+                    continue
+                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
+                if not neighbor_node.visited_validate and not current_node.blocked:
+                    neighbor_node.pathlength = current_node.pathlength + 1
+                    neighbor_node.visited_validate = True
+                    current.put(neighbor)
+
+    def _get_path(self, start_point, end_points):
+        path = [start_point]
+        current = start_point
+        move_direction = 0
+        while not self.game_map[current[0]][current[1]].pathlength == 0:
+            next_move = self._choose_next_move(current, move_direction, end_points)
+            if current[0] == next_move[0]:
+                move_direction = self.VERTICAL
+            else:
+                move_direction = self.HORIZONTAL
+            path.append(next_move)
+            current = next_move
+        return path
+
+    def _choose_next_move(self, current_point, previous_move_direction, end_points):
+        neighbors = self._get_neighbors(current_point)
+        ideal_neighbor = current_point
+        best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
+        for neighbor in neighbors:
+            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+                continue
+            new_best = False
+            x, y = neighbor
+            current_pathlength = self.game_map[x][y].pathlength
+            if current_pathlength > best_pathlength:
+                continue
+            elif current_pathlength < best_pathlength:
+                new_best = True
+            if not new_best and not self._better_direction(current_point, neighbor, ideal_neighbor, previous_move_direction, end_points):
+                continue
+            ideal_neighbor = neighbor
+            best_pathlength = current_pathlength
+        return ideal_neighbor
+
+    def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, end_points):
+        if previous_move_direction == self.HORIZONTAL and not new_tile[0] == prev_best[0]:
+            if prev_tile[1] == new_tile[1]:
+                return False
+            return True
+        if previous_move_direction == self.VERTICAL and not new_tile[1] == prev_best[1]:
+            if prev_tile[0] == new_tile[0]:
+                return False
+            return True
+        if previous_move_direction == 0:
+            if prev_tile[1] == new_tile[1]:
+                return False
+            return True
+        direction = self._get_direction_from_endpoints(end_points)
+        if new_tile[1] == prev_best[1]:
+            if direction[0] == 1 and new_tile[0] > prev_best[0]:
+                return True
+            if direction[0] == -1 and new_tile[0] < prev_best[0]:
+                return True
+            return False
+        if new_tile[0] == prev_best[0]:
+            if direction[1] == 1 and new_tile[1] > prev_best[1]:
+                return True
+            if direction[1] == -1 and new_tile[1] < prev_best[1]:
+                return True
+            return False
+        return True
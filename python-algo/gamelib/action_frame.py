@@ -0,0 +1,144 @@
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_KEY_PATTERNS = {}
+_BRACES = re.compile(r'[{}]')
+
+
+_STATE_TYPE = re.compile(r'"turnInfo"\s*:\s*\[\s*(\d+)')
+_EMPTY_EVENT_PATTERNS = {}
+
+
+def state_type(message):
+    """Reads the state type out of a raw engine message without decoding it
+
+    Args:
+        message: The message as a json string
+
+    Returns:
+        0 for a turn, 1 for an action frame, 2 for the end of the game, or None if the message has no turnInfo
+    """
+    match = _STATE_TYPE.search(message)
+    return int(match.group(1)) if match is not None else None
+
+
+def has_events(message, event_types):
+    """Checks a raw action frame for events of the given types without decoding it.
+    An event type counts as present unless its list is literally empty.
+
+    Args:
+        message: The frame as a json string
+        event_types: Event names from the frame's events object, for example ["breach", "death"]
+
+    Returns:
+        True if the frame has at least one event of any of the types
+    """
+    for event_type in event_types:
+        pattern = _EMPTY_EVENT_PATTERNS.get(event_type)
+        if pattern is None:
+            pattern = _EMPTY_EVENT_PATTERNS[event_type] = re.compile(r'"{}"\s*:\s*\[\s*\]'.format(re.escape(event_type)))
+        if pattern.search(message) is None:
+            return True
+    return False
+
+
+def _key_pattern(key):
+    pattern = _KEY_PATTERNS.get(key)
+    if pattern is None:
+        pattern = _KEY_PATTERNS[key] = re.compile(r'"{}"\s*:\s*'.format(re.escape(key)))
+    return pattern
+
+
+class LazyObject:
+    """A json object inside a message that is only decoded one key at a time.
+
+    A key is found by searching the raw text of the object for the quoted key followed by a colon, and only its value is decoded.
+    Matches inside nested objects are skipped by counting the braces before them, and the search stops at the brace closing the object.
+    Engine messages only hold numbers, lists and unit id strings besides their objects, so no brace can appear inside a string.
+    Values that are themselves objects are returned as another LazyObject.
+    Decoded values are kept, so reading a key twice is free. Keys can be read as attributes or with []
+
+    """
+    def __init__(self, text, start=0):
+        """ Wraps the object starting at text[start]
+
+        Args:
+            * text (string): The raw message
+            * start (int): The offset in text where the object starts
+
+        """
+        self._text = text
+        self._start = start
+        self._end = None
+        self._values = {}
+
+    def _find_end(self):
+        depth = 0
+        for brace in _BRACES.finditer(self._text, self._start):
+            depth += 1 if brace.group() == "{" else -1
+            if depth == 0:
+                return brace.end()
+        return len(self._text)
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        if self._end is None:
+            self._end = self._find_end()
+        text, start = self._text, self._start
+        pattern = _key_pattern(key)
+        match = pattern.search(text, start, self._end)
+        while match is not None and text.count("{", start, match.start()) - text.count("}", start, match.start()) != 1:
+            match = pattern.search(text, match.end(), self._end)
+        if match is None:
+            raise KeyError(key)
+        position = match.end()
+        if self._text[position] == "{":
+            value = LazyObject(self._text, position)
+        else:
+            value = _DECODER.raw_decode(self._text, position)[0]
+        self._values[key] = value
+        return value
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def get(self, key, default=None):
+        """Gets the value of key, or default if the object does not have it
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """Decodes the whole object
+
+        Returns:
+            The object as a dict
+        """
+        return _DECODER.raw_decode(self._text, self._start)[0]
+
+
+class ActionFrame(LazyObject):
+    """A lazy view of one action frame that decodes only the parts of the frame you read.
+
+    frame.events.breach decodes the breach list and nothing else, where json.loads would have decoded every unit
+    and every event list. Any top level key of the frame, such as turnInfo, p1Stats or p2Units, can be read the same way.
+    Full doc on format of a game frame at: https://docs.c1games.com/json-docs.html
+
+    """
+    def __init__(self, message):
+        """ Wraps a frame received from the engine
+
+        Args:
+            * message (string): The frame as a json string
+
+        """
+        super().__init__(str(message), 0)
@@ -1,7 +1,10 @@
 import json
 
-from .game_state import GameState
-from .util import get_command, debug_write, BANNER_TEXT, send_command
+from .action_frame import ActionFrame, state_type, has_events
+from .game_state import GameState, set_default_rules
+from .rules import RuleSet
+from .turn_clock import TurnClock
+from .util import get_command, debug_write, BANNER_TEXT, send_command, EngineMessage
 
 class AlgoCore(object):
     """
@@ -10,10 +13,24 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * parsed_messages (bool): If True, on_turn and on_action_frame are passed the decoded message as a dict. 
+          If False, the default, they are passed the message string, an EngineMessage that GameState reads without parsing it again
+        * lazy_frames (bool): If True, on_action_frame is passed an ActionFrame, which only decodes the parts of the frame that are read
+        * frame_events (list): The event types on_action_frame needs, for example ["breach"] or ["death"]. Frames without any of them
+          are dropped before they are decoded. If None, the default, every frame is passed on.
+          Frames are always dropped if you do not override on_action_frame
+        * speculative_planner (:obj: SpeculativePlanner): If set, every action frame is passed to its observe method, 
+          before frame_events filters them, so it can plan the next turn during the action phase
+        * turn_clock (:obj: TurnClock): Started when a turn message arrives, use turn_clock.remaining() in on_turn to see how much time is left
 
     """
     def __init__(self):
         self.config = None
+        self.parsed_messages = False
+        self.lazy_frames = False
+        self.frame_events = None
+        self.speculative_planner = None
+        self.turn_clock = TurnClock()
 
     def on_game_start(self, config):
         """
@@ -40,9 +57,17 @@ class AlgoCore(object):
         The action phase is made up of a sequence of distinct frames. 
         Each of these frames is sent to the algo in order. 
         They can be handled in this function. 
+        Set frame_events to only be sent the frames you are interested in.
         """
         pass
 
+    def _wants_frame(self, frame_string):
+        """Decides from the raw text whether an action frame should be passed to on_action_frame
+        """
+        if type(self).on_action_frame is AlgoCore.on_action_frame:
+            return False
+        return self.frame_events is None or has_events(frame_string, self.frame_events)
+
 
     def start(self):
         """ 
@@ -62,21 +87,33 @@ class AlgoCore(object):
                 This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
                 """
                 parsed_config = json.loads(game_state_string)
+                set_default_rules(RuleSet.for_config(parsed_config))
+                self.turn_clock = TurnClock(parsed_config)
                 self.on_game_start(parsed_config)
             elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
-                stateType = int(state.get("turnInfo")[0])
+                stateType = state_type(game_state_string)
+                if stateType == 0:
+                    self.turn_clock.start()
+                if stateType == 1 and self.speculative_planner is not None:
+                    self.speculative_planner.observe(game_state_string)
+                if stateType == 1 and not self._wants_frame(game_state_string):
+                    continue
+                if stateType == 1 and self.lazy_frames:
+                    message = ActionFrame(game_state_string)
+                elif stateType in (0, 1):
+                    state = json.loads(game_state_string)
+                    message = state if self.parsed_messages else EngineMessage(game_state_string, state)
                 if stateType == 0:
                     """
                     This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
                     deploy phase. Printing is handled by the provided functions.
                     """
-                    self.on_turn(game_state_string)
+                    self.on_turn(message)
                 elif stateType == 1:
                     """
                     If stateType == 1, this game_state_string string represents a single frame of an action phase
                     """
-                    self.on_action_frame(game_state_string)
+                    self.on_action_frame(message)
                 elif stateType == 2:
                     """
                     This is the end game message. This means the game is over so break and finish the program.
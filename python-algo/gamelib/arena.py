@@ -0,0 +1,177 @@
+"""
+Static topology of the diamond shaped arena, computed once at import time.
+
+Tiles are numbered with a single integer index, x * ARENA_SIZE + y, which is the layout used by
+the flat arrays in navigation.py and by GameMap.stationary_mask. The tables here let the rest of
+gamelib replace bounds arithmetic and neighbor construction in hot loops with lookups.
+
+Attributes :
+    * ARENA_SIZE (int): The size of the arena
+    * HALF_ARENA (int): Half the size of the arena
+    * TILE_COUNT (int): The number of indices, ARENA_SIZE * ARENA_SIZE. Only some of them are inside the arena
+    * IN_BOUNDS (bytes): IN_BOUNDS[index] is 1 if the tile is inside the diamond, 0 otherwise
+    * LOCATIONS (tuple): LOCATIONS[index] is the (x, y) tuple of the tile
+    * ARENA_TILES (tuple): The indices of all tiles inside the arena, ordered row by row from the bottom, the same order GameMap iterates in
+    * NEIGHBORS (tuple): NEIGHBORS[index] is a tuple of the in bounds neighbors of the tile, in the order up, down, right, left
+    * RANGE_CACHE_SIZE (int): How many (location, radius) results locations_in_range keeps before evicting the least recently used
+    * ARENA_MASK (int): A region mask with the bit of every tile inside the arena set
+    * UNIT_TYPE_SLOTS (int): How many unit types the Zobrist keys cover, the number of unitInformation entries in a config
+    * ZOBRIST_UNIT (tuple): The random 64 bit key of a stationary unit, see zobrist_key
+    * ZOBRIST_UPGRADED (tuple): ZOBRIST_UPGRADED[index] is xored in when the stationary unit on the tile is upgraded
+    * ZOBRIST_PENDING_REMOVAL (tuple): ZOBRIST_PENDING_REMOVAL[index] is xored in when it is flagged for removal
+
+Regions of the board are represented as int masks with bit tile_index(x, y) set for every tile in the region,
+so intersecting regions is a single & and counting a region is popcount.
+
+"""
+
+import functools
+import math
+import random
+
+ARENA_SIZE = 28
+HALF_ARENA = ARENA_SIZE // 2
+TILE_COUNT = ARENA_SIZE * ARENA_SIZE
+
+
+def _diamond_contains(x, y):
+    row_size = y + 1
+    startx = HALF_ARENA - row_size
+    endx = startx + (2 * row_size) - 1
+    top_half_check = (y < HALF_ARENA and x >= startx and x <= endx)
+
+    row_size = (ARENA_SIZE - 1 - y) + 1
+    startx = HALF_ARENA - row_size
+    endx = startx + (2 * row_size) - 1
+    bottom_half_check = (y >= HALF_ARENA and x >= startx and x <= endx)
+
+    return bottom_half_check or top_half_check
+
+
+def tile_index(x, y):
+    """The index of the tile at x, y. Only meaningful for coordinates inside the arena.
+    """
+    return x * ARENA_SIZE + y
+
+
+def tile_location(index):
+    """The [x, y] location of the tile with the given index
+    """
+    return list(divmod(index, ARENA_SIZE))
+
+
+def in_arena_bounds(x, y):
+    """Checks if the given coordinates are inside the diamond shaped game board, using the precomputed table.
+    """
+    return 0 <= x < ARENA_SIZE and 0 <= y < ARENA_SIZE and IN_BOUNDS[int(x) * ARENA_SIZE + int(y)] == 1
+
+
+LOCATIONS = tuple(divmod(index, ARENA_SIZE) for index in range(TILE_COUNT))
+
+IN_BOUNDS = bytes(1 if _diamond_contains(x, y) else 0 for x, y in LOCATIONS)
+
+ARENA_TILES = tuple(tile_index(x, y) for y in range(ARENA_SIZE) for x in range(ARENA_SIZE) if IN_BOUNDS[tile_index(x, y)])
+
+
+def _neighbors_of(index):
+    x, y = LOCATIONS[index]
+    return tuple(tile_index(nx, ny) for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)) if in_arena_bounds(nx, ny))
+
+
+NEIGHBORS = tuple(_neighbors_of(index) if IN_BOUNDS[index] else () for index in range(TILE_COUNT))
+
+
+RANGE_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=None)
+def range_stencil(radius, get_hit_radius):
+    """The (dx, dy) offsets of every tile affected by something with the given radius.
+    A unit with a given range affects all locations who's centers are within that range + get hit radius.
+    Radii come from the small fixed set in the game config, so every stencil is kept.
+    """
+    search_radius = math.ceil(radius)
+    reach = radius + get_hit_radius
+    return tuple((dx, dy) for dx in range(-search_radius, search_radius + 1) for dy in range(-search_radius, search_radius + 1)
+                 if math.sqrt(dx ** 2 + dy ** 2) < reach)
+
+
+@functools.lru_cache(maxsize=RANGE_CACHE_SIZE)
+def locations_in_range(x, y, radius, get_hit_radius):
+    """The (x, y) tuples of the locations inside the arena within range of x, y, see range_stencil.
+    The result is cached and shared between callers, so it is made of tuples that cannot be changed.
+    """
+    return tuple((x + dx, y + dy) for dx, dy in range_stencil(radius, get_hit_radius) if in_arena_bounds(x + dx, y + dy))
+
+
+def popcount(mask):
+    """The number of tiles in a region mask
+    """
+    return bin(mask).count("1")
+
+
+def region_mask(locations):
+    """The region mask of a list of [x, y] locations. Locations outside the arena are ignored.
+    """
+    mask = 0
+    for x, y in locations:
+        if in_arena_bounds(x, y):
+            mask |= 1 << tile_index(x, y)
+    return mask
+
+
+def mask_indices(mask):
+    """Yields the tile indices in a region mask, in increasing order
+    """
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def mask_locations(mask):
+    """The [x, y] locations in a region mask, ordered by tile index
+    """
+    return [tile_location(index) for index in mask_indices(mask)]
+
+
+ARENA_MASK = region_mask(LOCATIONS)
+
+
+UNIT_TYPE_SLOTS = 8
+ZOBRIST_SEED = 0x5eed
+
+_zobrist_random = random.Random(ZOBRIST_SEED)
+ZOBRIST_UNIT = tuple(_zobrist_random.getrandbits(64) for _ in range(TILE_COUNT * UNIT_TYPE_SLOTS * 2))
+ZOBRIST_UPGRADED = tuple(_zobrist_random.getrandbits(64) for _ in range(TILE_COUNT))
+ZOBRIST_PENDING_REMOVAL = tuple(_zobrist_random.getrandbits(64) for _ in range(TILE_COUNT))
+del _zobrist_random
+
+
+def zobrist_key(index, type_index, player_index, upgraded=False, pending_removal=False):
+    """The Zobrist key of a stationary unit on a tile. The hash of a board is the xor of the keys of its stationary units,
+    so a tile changing only needs its old key xored out and its new key xored in.
+    The keys are drawn from a fixed seed, so equal boards hash equally across GameMaps, turns and processes.
+
+    Args:
+        index: The tile index
+        type_index: The index of the unit type in the config's unitInformation, must be below UNIT_TYPE_SLOTS
+        player_index: The owner of the unit, 0 or 1
+        upgraded: Whether the unit is upgraded
+        pending_removal: Whether the unit is flagged for removal
+
+    Returns:
+        A 64 bit int
+
+    Raises:
+        ValueError: If type_index is not below UNIT_TYPE_SLOTS, as its key would be another tile's
+    """
+    if not 0 <= type_index < UNIT_TYPE_SLOTS:
+        raise ValueError("Unit type index {} has no Zobrist key, only {} unit types are supported".format(
+            type_index, UNIT_TYPE_SLOTS))
+    key = ZOBRIST_UNIT[(index * UNIT_TYPE_SLOTS + type_index) * 2 + player_index]
+    if upgraded:
+        key ^= ZOBRIST_UPGRADED[index]
+    if pending_removal:
+        key ^= ZOBRIST_PENDING_REMOVAL[index]
+    return key
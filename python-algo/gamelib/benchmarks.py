@@ -0,0 +1,53 @@
+"""
+Micro-benchmarks for the pathfinding code in navigation.py.
+
+Run them from the algo folder with `python -m gamelib.benchmarks`. For each board every open
+location on our deploy edges is pathed to its target edge, once with the current ShortestPathFinder
+and once with the original Node grid implementation kept in _reference.py.
+The average time per query and the speedup are printed for each board.
+"""
+
+import timeit
+
+from .navigation import ShortestPathFinder
+from ._reference import ReferencePathFinder, make_season_state, make_random_board
+
+
+def wall_with_gap_board():
+    """A full wall of filters along our front with a single gap in the corner, which forces long paths"""
+    state = make_season_state()
+    for x in range(1, 28):
+        state.game_map.add_unit("FF", [x, 13], 0)
+    return state
+
+
+def representative_boards():
+    return [
+        ("empty", make_season_state()),
+        ("spread defence", make_random_board(1, density=0.15)),
+        ("dense defence", make_random_board(2, density=0.35)),
+        ("wall with gap", wall_with_gap_board()),
+    ]
+
+
+def time_per_query(finder, state, queries, repeat):
+    def run():
+        for start, end_points in queries:
+            finder.navigate_multiple_endpoints(start, end_points, state)
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(queries)
+
+
+def main(repeat=5):
+    print("{:<16}{:>8}{:>16}{:>16}{:>10}".format("board", "queries", "reference (ms)", "current (ms)", "speedup"))
+    for name, state in representative_boards():
+        game_map = state.game_map
+        starts = game_map.get_edge_locations(game_map.BOTTOM_LEFT) + game_map.get_edge_locations(game_map.BOTTOM_RIGHT)
+        queries = [(start, game_map.get_edge_locations(state.get_target_edge(start))) for start in starts
+                   if not state.contains_stationary_unit(start)]
+        reference = time_per_query(ReferencePathFinder(), state, queries, repeat)
+        current = time_per_query(ShortestPathFinder(), state, queries, repeat)
+        print("{:<16}{:>8}{:>16.3f}{:>16.3f}{:>9.1f}x".format(name, len(queries), reference * 1000, current * 1000, reference / current))
+
+
+if __name__ == "__main__":
+    main()
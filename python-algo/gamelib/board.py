@@ -0,0 +1,178 @@
+from array import array
+
+from . import arena
+
+
+class BoardArrays:
+    """A struct of arrays view of the units on a GameMap, for queries over the whole board or large regions.
+
+    The stationary unit on each tile is described by parallel arrays indexed by tile index, mobile units by a stack count per player,
+    and the tiles holding each player's units of each type by a region mask, see arena.py.
+    Counting units of a type in a region is then a popcount of an & of two ints instead of a walk over unit lists.
+
+    The arrays follow every change made through GameMap.add_unit, GameMap.remove_unit, item assignment and GameState.attempt_upgrade.
+    Health is read when a tile changes, so damage dealt to a GameUnit afterwards is not reflected.
+    Get the arrays for a map with GameMap.get_arrays(). The unit lists of game_map[x, y] stay the place the GameUnits live.
+
+    Attributes :
+        * unit_types (tuple): The unit types, unit_type[index] is an index into it
+        * unit_type (array): The index in unit_types of the stationary unit on each tile, -1 if there is none
+        * owner (array): The player_index of the stationary unit on each tile, -1 if there is none
+        * health (array): The health of the stationary unit on each tile
+        * upgraded (bytearray): 1 if the stationary unit on the tile is upgraded
+        * pending_removal (bytearray): 1 if the stationary unit on the tile is flagged for removal
+        * mobile_count (list): mobile_count[player_index][index] is the number of that player's information units on the tile
+
+    """
+    def __init__(self, game_map):
+        """Reads every tile of the map
+
+        Args:
+            game_map: The GameMap to follow
+
+        """
+        self.game_map = game_map
+        self.unit_types = tuple(game_map.rules.unit_stats)
+        self.__type_index = {unit_type: i for i, unit_type in enumerate(self.unit_types)}
+        self.unit_type = array('b', [-1]) * arena.TILE_COUNT
+        self.owner = array('b', [-1]) * arena.TILE_COUNT
+        self.health = array('d', [0.0]) * arena.TILE_COUNT
+        self.upgraded = bytearray(arena.TILE_COUNT)
+        self.pending_removal = bytearray(arena.TILE_COUNT)
+        self.mobile_count = [array('H', [0]) * arena.TILE_COUNT for _ in range(2)]
+        self.__masks = [[0] * len(self.unit_types) for _ in range(2)]
+        self.__mobile_masks = [0, 0]
+        for index in arena.ARENA_TILES:
+            self.refresh(*arena.LOCATIONS[index])
+
+    def refresh(self, x, y):
+        """Brings the arrays up to date with the units currently at a location
+
+        Args:
+            x, y: The location that changed
+
+        """
+        index = arena.tile_index(x, y)
+        bit = 1 << index
+        old_type = self.unit_type[index]
+        if old_type >= 0:
+            self.__masks[self.owner[index]][old_type] &= ~bit
+        self.unit_type[index] = -1
+        self.owner[index] = -1
+        self.health[index] = 0.0
+        self.upgraded[index] = 0
+        self.pending_removal[index] = 0
+        counts = [0, 0]
+        for unit in self.game_map[x, y]:
+            if unit.stationary:
+                type_index = self.__type_index[unit.unit_type]
+                self.unit_type[index] = type_index
+                self.owner[index] = unit.player_index
+                self.health[index] = unit.health
+                self.upgraded[index] = unit.upgraded
+                self.pending_removal[index] = unit.pending_removal
+                self.__masks[unit.player_index][type_index] |= bit
+            else:
+                counts[unit.player_index] += 1
+        for player_index in range(2):
+            self.mobile_count[player_index][index] = counts[player_index]
+            if counts[player_index]:
+                self.__mobile_masks[player_index] |= bit
+            else:
+                self.__mobile_masks[player_index] &= ~bit
+
+    def stationary_mask(self, unit_type=None, player_index=None):
+        """The region mask of the tiles holding stationary units
+
+        Args:
+            unit_type: Only tiles with this type, all firewall types if None
+            player_index: Only tiles with this player's units, both players if None
+
+        Returns:
+            An int region mask, see arena.py
+        """
+        players = range(2) if player_index is None else (player_index,)
+        if unit_type is None:
+            types = range(len(self.unit_types))
+        elif unit_type in self.__type_index:
+            types = (self.__type_index[unit_type],)
+        else:
+            return 0
+        mask = 0
+        for player in players:
+            for type_index in types:
+                mask |= self.__masks[player][type_index]
+        return mask
+
+    def mobile_mask(self, player_index=None):
+        """The region mask of the tiles holding information units
+
+        Args:
+            player_index: Only tiles with this player's units, both players if None
+
+        Returns:
+            An int region mask, see arena.py
+        """
+        if player_index is None:
+            return self.__mobile_masks[0] | self.__mobile_masks[1]
+        return self.__mobile_masks[player_index]
+
+    def count(self, region=arena.ARENA_MASK, unit_type=None, player_index=None):
+        """Counts the stationary units in a region
+
+        Args:
+            region: An int region mask, or a list of locations
+            unit_type: Only count this type, all types if None
+            player_index: Only count this player's units, both players if None
+
+        Returns:
+            The number of stationary units
+        """
+        if not isinstance(region, int):
+            region = arena.region_mask(region)
+        return arena.popcount(self.stationary_mask(unit_type, player_index) & region)
+
+    def count_by_type(self, region=arena.ARENA_MASK, player_index=None):
+        """Counts the stationary units of each type in a region
+
+        Args:
+            region: An int region mask, or a list of locations
+            player_index: Only count this player's units, both players if None
+
+        Returns:
+            A dict from unit type to the number of units, with every stationary type
+        """
+        if not isinstance(region, int):
+            region = arena.region_mask(region)
+        return {unit_type: arena.popcount(self.stationary_mask(unit_type, player_index) & region)
+                for unit_type in self.unit_types if self.game_map.rules.is_stationary(unit_type)}
+
+    def count_mobile(self, region=arena.ARENA_MASK, player_index=0):
+        """Counts one player's information units in a region
+
+        Args:
+            region: An int region mask, or a list of locations
+            player_index: The player whose units are counted
+
+        Returns:
+            The number of information units
+        """
+        if not isinstance(region, int):
+            region = arena.region_mask(region)
+        counts = self.mobile_count[player_index]
+        return sum(counts[index] for index in arena.mask_indices(self.__mobile_masks[player_index] & region))
+
+    def locations(self, unit_type=None, player_index=None, region=arena.ARENA_MASK):
+        """The locations of the stationary units matching a query
+
+        Args:
+            unit_type: Only this type, all types if None
+            player_index: Only this player's units, both players if None
+            region: An int region mask, or a list of locations
+
+        Returns:
+            A list of [x, y] locations ordered by tile index
+        """
+        if not isinstance(region, int):
+            region = arena.region_mask(region)
+        return arena.mask_locations(self.stationary_mask(unit_type, player_index) & region)
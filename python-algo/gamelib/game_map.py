@@ -1,4 +1,9 @@
+import copy
 import math
+from array import array
+from . import arena
+from .board import BoardArrays
+from .rules import RuleSet
 from .unit import GameUnit
 from .util import debug_write
 
@@ -11,6 +16,7 @@ class GameMap:
 
     Attributes :
         * config (JSON): Contains information about the current game rules
+        * rules (:obj: RuleSet): The unit types and rules read from config
         * enable_warnings (bool): If true, debug messages for game_map functions will print out
         * ARENA_SIZE (int): The size of the arena.
         * HALF_ARENA (int): Half of the size of the arena.
@@ -18,16 +24,25 @@ class GameMap:
         * TOP_LEFT (int): A constant that represents the top left edge
         * BOTTOM_LEFT (int): Hidden challenge! Can you guess what this constant represents???
         * BOTTOM_RIGHT (int): A constant that represents the bottom right edge
+        * stationary_mask (int): Bitmask of the tiles holding a stationary unit, bit x * ARENA_SIZE + y is set if [x, y] is blocked.
+          It is kept up to date by add_unit, remove_unit and item assignment, so edit the map through those rather than mutating the unit lists
+        * board_hash (int): A 64 bit Zobrist hash of the stationary units, covering the type, owner, upgrade and removal flag on every tile.
+          Equal boards have equal hashes, so it can key caches of paths, threat or plan scores. It is updated with stationary_mask,
+          and by GameState.attempt_upgrade and attempt_remove
+
+    A GameMap made by fork shares its unit lists with the map it was forked from until either side changes a location,
+    so always change a forked map through add_unit, remove_unit or item assignment.
 
     """
     def __init__(self, config):
         """Initializes constants and game map
 
         Args:
-            config (JSON): Contains information about the game
+            config: The RuleSet of the game, or the config (JSON) it is read from
 
         """
-        self.config = config
+        self.rules = RuleSet.for_config(config)
+        self.config = self.rules.config
         self.enable_warnings = True
         self.ARENA_SIZE = 28
         self.HALF_ARENA = int(self.ARENA_SIZE / 2)
@@ -36,35 +51,39 @@ class GameMap:
         self.BOTTOM_LEFT = 2
         self.BOTTOM_RIGHT = 3
         self.__map = self.__empty_grid()
-        self.__start = [13,0]
+        self.__start = 0
+        self.stationary_mask = 0
+        self.board_hash = 0
+        self.__tile_hashes = array('Q', [0]) * arena.TILE_COUNT
+        self.__tile_observers = []
+        self.__owned_columns = None
+        self.__owned_tiles = None
+        self.__arrays = None
     
     def __getitem__(self, location):
-        if len(location) == 2 and self.in_arena_bounds(location):
+        if len(location) == 2:
             x,y = location
-            return self.__map[x][y]
+            if arena.in_arena_bounds(x, y):
+                return self.__map[x][y]
         self._invalid_coordinates(location)
 
     def __setitem__(self, location, val):
-        if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
-            self.__map[location[0]][location[1]] = val
+        if type(location) == tuple and len(location) == 2 and arena.in_arena_bounds(*location):
+            self.__replace_tile(location[0], location[1], val)
+            self._update_stationary_mask(location[0], location[1])
+            self._tile_changed(location[0], location[1])
             return
         self._invalid_coordinates(location)
 
     def __iter__(self):
-        self.__start = [13,0]
+        self.__start = 0
         return self
     
     def __next__(self):
-        location = self.__start
-        if location == [15,27]:
+        if self.__start == len(arena.ARENA_TILES):
             raise StopIteration
-        new_location = [location[0]+1, location[1]]
-        while not self.in_arena_bounds(new_location) and not location == [14,27]:
-            if new_location[0] == self.ARENA_SIZE:
-                new_location = [0, new_location[1]+1]
-            else:
-                new_location = [new_location[0]+1, new_location[1]]
-        self.__start = new_location
+        location = arena.tile_location(arena.ARENA_TILES[self.__start])
+        self.__start += 1
         return location 
 
     def __empty_grid(self):
@@ -75,6 +94,118 @@ class GameMap:
                 grid[x].append([])
         return grid
 
+    def fork(self):
+        """Makes a copy of the map that shares its unit lists and GameUnits with this one until either map changes them.
+        Forking costs one list of columns, changed locations are copied the first time they are written on either side.
+        The config is shared and tile observers are not copied.
+
+        Returns:
+            A new GameMap with the same units
+
+        """
+        child = copy.copy(self)
+        child.__map = list(self.__map)
+        child.__start = 0
+        child.__tile_hashes = array('Q', self.__tile_hashes)
+        child.__tile_observers = []
+        child.__arrays = None
+        child.__owned_columns = set()
+        child.__owned_tiles = set()
+        self.__owned_columns = set()
+        self.__owned_tiles = set()
+        return child
+
+    def __writable_column(self, x):
+        if self.__owned_columns is not None and x not in self.__owned_columns:
+            self.__map[x] = list(self.__map[x])
+            self.__owned_columns.add(x)
+        return self.__map[x]
+
+    def __replace_tile(self, x, y, units):
+        self.__writable_column(x)[y] = units
+        if self.__owned_tiles is not None:
+            self.__owned_tiles.add(arena.tile_index(x, y))
+
+    def _writable_tile(self, x, y):
+        """The list of units at x, y, copied together with its GameUnits first if it is still shared with a fork.
+        Use it instead of game_map[x, y] before changing a unit in place.
+        """
+        column = self.__writable_column(x)
+        if self.__owned_tiles is not None:
+            index = arena.tile_index(x, y)
+            if index not in self.__owned_tiles:
+                column[y] = [copy.copy(unit) for unit in column[y]]
+                self.__owned_tiles.add(index)
+        return column[y]
+
+    def _save_tile(self, x, y):
+        """The units at x, y and whether their list belongs to this map alone, to put back later with _restore_tile
+        """
+        owned = self.__owned_tiles is None or arena.tile_index(x, y) in self.__owned_tiles
+        return (self.__map[x][y], owned)
+
+    def _restore_tile(self, x, y, saved):
+        """Puts back the units saved by _save_tile, along with whether their list is still shared with a fork
+        """
+        units, owned = saved
+        self.__writable_column(x)[y] = units
+        if self.__owned_tiles is not None:
+            if owned:
+                self.__owned_tiles.add(arena.tile_index(x, y))
+            else:
+                self.__owned_tiles.discard(arena.tile_index(x, y))
+        self._update_stationary_mask(x, y)
+        self._tile_changed(x, y)
+
+    def _update_stationary_mask(self, x, y):
+        bit = 1 << arena.tile_index(x, y)
+        if any(unit.stationary for unit in self.__map[x][y]):
+            self.stationary_mask |= bit
+        else:
+            self.stationary_mask &= ~bit
+
+    def _add_tile_observer(self, callback):
+        """Registers callback(x, y) to be called whenever the units at a location are changed through this GameMap
+        """
+        self.__tile_observers.append(callback)
+
+    def get_arrays(self):
+        """Gets the BoardArrays of this map, building them on first use. They are kept up to date with the map from then on.
+
+        Returns:
+            A BoardArrays with per tile arrays and per type region masks for counting units
+
+        """
+        if self.__arrays is None:
+            self.__arrays = BoardArrays(self)
+        return self.__arrays
+
+    def _tile_changed(self, x, y):
+        index = arena.tile_index(x, y)
+        tile_hash = 0
+        for unit in self.__map[x][y]:
+            if unit.stationary:
+                tile_hash = arena.zobrist_key(index, self.rules.UNIT_TYPE_TO_INDEX[unit.unit_type], unit.player_index,
+                                              unit.upgraded, unit.pending_removal)
+        self.board_hash ^= self.__tile_hashes[index] ^ tile_hash
+        self.__tile_hashes[index] = tile_hash
+        if self.__arrays is not None:
+            self.__arrays.refresh(x, y)
+        for callback in self.__tile_observers:
+            callback(x, y)
+
+    def _place_unit(self, unit):
+        """Puts an existing GameUnit on the map at its own location, replacing whatever was there if it is stationary.
+        """
+        x, y = unit.x, unit.y
+        if not unit.stationary:
+            self._writable_tile(x, y).append(unit)
+            self._tile_changed(x, y)
+        else:
+            self.__replace_tile(x, y, [unit])
+            self.stationary_mask |= 1 << arena.tile_index(x, y)
+            self._tile_changed(x, y)
+
     def _invalid_coordinates(self, location):
         self.warn("{} is out of bounds.".format(str(location)))
 
@@ -89,19 +220,7 @@ class GameMap:
         
         """
         x, y = location
-        half_board = self.HALF_ARENA
-
-        row_size = y + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        top_half_check = (y < self.HALF_ARENA and x >= startx and x <= endx)
-
-        row_size = (self.ARENA_SIZE - 1 - y) + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        bottom_half_check = (y >= self.HALF_ARENA and x >= startx and x <= endx)
-
-        return bottom_half_check or top_half_check
+        return arena.in_arena_bounds(x, y)
 
     def get_edge_locations(self, quadrant_description):
         """Takes in an edge description and returns a list of locations.
@@ -166,12 +285,8 @@ class GameMap:
         if player_index < 0 or player_index > 1:
             self.warn("Player index {} is invalid. Player index should be 0 or 1.".format(player_index))
 
-        x, y = location
-        new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
-        if not new_unit.stationary:
-            self.__map[x][y].append(new_unit)
-        else:
-            self.__map[x][y] = [new_unit]
+        new_unit = GameUnit(unit_type, self.rules, player_index, None, location[0], location[1])
+        self._place_unit(new_unit)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +301,9 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
-        self.__map[x][y] = []
+        self.__replace_tile(x, y, [])
+        self.stationary_mask &= ~(1 << arena.tile_index(x, y))
+        self._tile_changed(x, y)
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -196,7 +313,8 @@ class GameMap:
             radius: The radius of our search area
 
         Returns:
-            The locations that are within our search area
+            The locations that are within our search area, as new [x, y] lists the caller may change.
+            Code inside gamelib reads the shared tuples of arena.locations_in_range instead
 
         """
         if radius < 0 or radius > self.ARENA_SIZE:
@@ -205,16 +323,7 @@ class GameMap:
             self._invalid_coordinates(location)
 
         x, y = location
-        locations = []
-        search_radius = math.ceil(radius)
-        getHitRadius = self.config["unitInformation"][0]['getHitRadius']
-        for i in range(int(x - search_radius), int(x + search_radius + 1)):
-            for j in range(int(y - search_radius), int(y + search_radius + 1)):
-                new_location = [i, j]
-                # A unit with a given range affects all locations who's centers are within that range + get hit radius
-                if self.in_arena_bounds(new_location) and self.distance_between_locations(location, new_location) < radius + getHitRadius:
-                    locations.append(new_location)
-        return locations
+        return [[tx, ty] for tx, ty in arena.locations_in_range(x, y, radius, self.rules.get_hit_radius)]
 
     def distance_between_locations(self, location_1, location_2):
         """Euclidean distance
@@ -1,21 +1,50 @@
+import contextlib
+import copy
 import math
 import json
 import sys
+import warnings
 
+from . import arena
 from .navigation import ShortestPathFinder
-from .util import send_command, debug_write
+from .threat_map import ThreatMap
+from .rules import RuleSet
+from .util import send_command, debug_write, decode_message
 from .unit import GameUnit
 from .game_map import GameMap
+from .snapshot import TurnSnapshot
 
-def is_stationary(unit_type):
+# The RuleSet is_stationary falls back to when it is not given one, only ever set through set_default_rules
+_default_rules = None
+
+def set_default_rules(rules):
+    """Sets the RuleSet the deprecated one argument form of is_stationary reads.
+    AlgoCore sets it to the rules of the game's config when the config arrives.
+
+    Args:
+        rules: A RuleSet, or None to clear it
+    """
+    global _default_rules
+    _default_rules = rules
+
+def is_stationary(unit_type, rules=None):
     """
         Args:
             unit_type: A unit type
+            rules: The RuleSet of the game. Leaving it out is deprecated and reads the RuleSet given to set_default_rules
         
         Returns: 
             Boolean, True if the unit is stationary, False otherwise.
+
+        Raises:
+            ValueError: If rules is left out and no default RuleSet has been set
     """
-    return unit_type in FIREWALL_TYPES
+    if rules is None:
+        warnings.warn("is_stationary without rules is deprecated, pass the GameState's rules", DeprecationWarning, stacklevel=2)
+        rules = _default_rules
+        if rules is None:
+            raise ValueError("is_stationary needs a RuleSet, pass one or call set_default_rules first")
+    return rules.is_stationary(unit_type)
 
 class GameState:
     """Represents the entire gamestate for a given turn
@@ -31,7 +60,9 @@ class GameState:
         * SCRAMBLER (str): A constant representing the scrambler unit
         * REMOVE (str): A constant representing removing your own unit
         * UPGRADE (str): A constant representing upgrading a unit
-        * FIREWALL_TYPES (list): A list of the firewall units
+        * FIREWALL_TYPES (tuple): The firewall units
+        * ALL_UNITS (tuple): Every unit type that can be spawned
+        * rules (:obj: RuleSet): The unit types and rules of the config, all of the constants above come from it
 
         * ARENA_SIZE (int): The size of the arena
         * HALF_ARENA (int): Half the size of the arena
@@ -44,6 +75,7 @@ class GameState:
         * my_time (int): The time you took to submit your previous turn
         * enemy_health (int): Your opponents current remaining health
         * enemy_time (int): Your opponents current remaining time
+        * path_cache (:obj: PathCache): If set, find_path_to_edge and find_paths_to_edge_batch reuse the paths cached in it. None by default
 
     """
 
@@ -52,47 +84,39 @@ class GameState:
 
         Args:
             * config (JSON): A json object containing information about the game
-            * serialized_string (string): A string containing information about the game state at the start of this turn
+            * serialized_string (string): A string containing information about the game state at the start of this turn.
+              The decoded dict, or the EngineMessage AlgoCore passes to on_turn, is used as is instead of parsing it again
 
         """
         self.serialized_string = serialized_string
         self.config = config
         self.enable_warnings = True
 
-        global FILTER, ENCRYPTOR, DESTRUCTOR, PING, EMP, SCRAMBLER, REMOVE, UPGRADE, FIREWALL_TYPES, ALL_UNITS, UNIT_TYPE_TO_INDEX
-        UNIT_TYPE_TO_INDEX = {}
-        FILTER = config["unitInformation"][0]["shorthand"]
-        UNIT_TYPE_TO_INDEX[FILTER] = 0
-        ENCRYPTOR = config["unitInformation"][1]["shorthand"]
-        UNIT_TYPE_TO_INDEX[ENCRYPTOR] = 1
-        DESTRUCTOR = config["unitInformation"][2]["shorthand"]
-        UNIT_TYPE_TO_INDEX[DESTRUCTOR] = 2
-        PING = config["unitInformation"][3]["shorthand"]
-        UNIT_TYPE_TO_INDEX[PING] = 3
-        EMP = config["unitInformation"][4]["shorthand"]
-        UNIT_TYPE_TO_INDEX[EMP] = 4
-        SCRAMBLER = config["unitInformation"][5]["shorthand"]
-        UNIT_TYPE_TO_INDEX[SCRAMBLER] = 5
-        REMOVE = config["unitInformation"][6]["shorthand"]
-        UNIT_TYPE_TO_INDEX[REMOVE] = 6
-        UPGRADE = config["unitInformation"][7]["shorthand"]
-        UNIT_TYPE_TO_INDEX[UPGRADE] = 7
-
-        ALL_UNITS = [PING, EMP, SCRAMBLER, FILTER, ENCRYPTOR, DESTRUCTOR]
-        FIREWALL_TYPES = [FILTER, ENCRYPTOR, DESTRUCTOR]
+        self.rules = RuleSet.for_config(config)
+        rules = self.rules
+        self.UNIT_TYPE_TO_INDEX = dict(rules.UNIT_TYPE_TO_INDEX)
+        self.FILTER = rules.FILTER
+        self.ENCRYPTOR = rules.ENCRYPTOR
+        self.DESTRUCTOR = rules.DESTRUCTOR
+        self.PING = rules.PING
+        self.EMP = rules.EMP
+        self.SCRAMBLER = rules.SCRAMBLER
+        self.REMOVE = rules.REMOVE
+        self.UPGRADE = rules.UPGRADE
+        self.FIREWALL_TYPES = rules.FIREWALL_TYPES
+        self.ALL_UNITS = rules.ALL_UNITS
 
         self.ARENA_SIZE = 28
         self.HALF_ARENA = int(self.ARENA_SIZE / 2)
-        self.BITS = 1
-        self.CORES = 0
-        global BITS, CORES
-        BITS = self.BITS
-        CORES = self.CORES
+        self.BITS = rules.BITS
+        self.CORES = rules.CORES
 
-        self.game_map = GameMap(self.config)
+        self.game_map = GameMap(self.rules)
         self._shortest_path_finder = ShortestPathFinder()
         self._build_stack = []
         self._deploy_stack = []
+        self._threat_map = None
+        self.path_cache = None
         self._player_resources = [
                 {'cores': 0, 'bits': 0},  # player 0, which is you
                 {'cores': 0, 'bits': 0}]  # player 1, which is the opponent
@@ -101,9 +125,9 @@ class GameState:
     def __parse_state(self, state_line):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
-        state_line is the game state as a json string.
+        state_line is the game state as a json string, or already decoded.
         """
-        state = json.loads(state_line)
+        state = decode_message(state_line)
 
         turn_info = state["turnInfo"]
         self.turn_number = int(turn_info[1])
@@ -131,6 +155,7 @@ class GameState:
         Helper function for __parse_state to add units to the map.
         """
         typedef = self.config.get("unitInformation")
+        REMOVE, UPGRADE = self.REMOVE, self.UPGRADE
         for i, unit_types in enumerate(units):
             for uinfo in unit_types:
                 unit_type = typedef[i].get("shorthand")
@@ -142,15 +167,17 @@ class GameState:
                     # Quick fix will deploy engine fix soon
                     if self.contains_stationary_unit([x,y]):
                         self.game_map[x,y][0].pending_removal = True
+                        self.game_map._tile_changed(x, y)
                 elif unit_type == UPGRADE:
                     if self.contains_stationary_unit([x,y]):
                         self.game_map[x,y][0].upgrade()
+                        self.game_map._tile_changed(x, y)
                 else:
-                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+                    unit = GameUnit(unit_type, self.rules, player_number, hp, x, y)
+                    self.game_map._place_unit(unit)
 
     def __resource_required(self, unit_type):
-        return self.CORES if is_stationary(unit_type) else self.BITS
+        return self.CORES if self.rules.is_stationary(unit_type) else self.BITS
 
     def __set_resource(self, resource_type, amount, player_index=0):
         """
@@ -234,10 +261,11 @@ class GameState:
             The number of units affordable of the given unit_type.
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
 
+        BITS, CORES = self.BITS, self.CORES
         costs = self.type_cost(unit_type)
         player_held = self.get_resources()
         if costs[BITS] > 0 and costs[CORES] > 0:
@@ -289,16 +317,11 @@ class GameState:
             The units costs as a list [CORES, BITS]
 
         """
-        if unit_type == REMOVE:
+        if unit_type == self.REMOVE:
             self._invalid_unit(unit_type)
             return
         
-        unit_def = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[unit_type]]
-        cost_base = [unit_def.get('cost1', 0), unit_def.get('cost2', 0)]
-        if upgrade:
-            return [unit_def.get('upgrade', {}).get('cost1', cost_base[CORES]), unit_def.get('upgrade', {}).get('cost2', cost_base[BITS])]
-
-        return cost_base
+        return list(self.rules.type_cost(unit_type, upgrade))
 
 
     def can_spawn(self, unit_type, location, num=1):
@@ -317,7 +340,7 @@ class GameState:
             True if we can spawn the unit(s)
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
         
@@ -327,7 +350,7 @@ class GameState:
             return False
 
         affordable = self.number_affordable(unit_type) >= num
-        stationary = is_stationary(unit_type)
+        stationary = self.rules.is_stationary(unit_type)
         blocked = self.contains_stationary_unit(location) or (stationary and len(self.game_map[location[0],location[1]]) > 0)
         correct_territory = location[1] < self.HALF_ARENA
         on_edge = location in (self.game_map.get_edge_locations(self.game_map.BOTTOM_LEFT) + self.game_map.get_edge_locations(self.game_map.BOTTOM_RIGHT))
@@ -361,7 +384,7 @@ class GameState:
             The number of units successfully spawned
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
         if num < 1:
@@ -376,10 +399,10 @@ class GameState:
                 if self.can_spawn(unit_type, location, 1):
                     x, y = map(int, location)
                     costs = self.type_cost(unit_type)
-                    self.__set_resource(CORES, 0 - costs[CORES])
-                    self.__set_resource(BITS, 0 - costs[BITS])
+                    self.__set_resource(self.CORES, 0 - costs[self.CORES])
+                    self.__set_resource(self.BITS, 0 - costs[self.BITS])
                     self.game_map.add_unit(unit_type, location, 0)
-                    if is_stationary(unit_type):
+                    if self.rules.is_stationary(unit_type):
                         self._build_stack.append((unit_type, x, y))
                     else:
                         self._deploy_stack.append((unit_type, x, y))
@@ -390,6 +413,7 @@ class GameState:
 
     def attempt_remove(self, locations):
         """Attempts to remove existing friendly firewalls in the given locations.
+        The firewalls stay on the map, flagged with pending_removal, until the end of the round.
 
         Args:
             locations: A location or list of locations we want to remove firewalls from
@@ -404,7 +428,11 @@ class GameState:
         for location in locations:
             if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
                 x, y = map(int, location)
-                self._build_stack.append((REMOVE, x, y))
+                self._build_stack.append((self.REMOVE, x, y))
+                for unit in self.game_map._writable_tile(x, y):
+                    if unit.stationary:
+                        unit.pending_removal = True
+                self.game_map._tile_changed(x, y)
                 removed_units += 1
             else:
                 self.warn("Could not remove a unit from {}. Location has no firewall or is enemy territory.".format(location))
@@ -428,18 +456,20 @@ class GameState:
             if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
                 x, y = map(int, location)
                 existing_unit = None
-                for unit in self.game_map[x,y]:
+                for unit in self.game_map._writable_tile(x, y):
                     if unit.stationary:
                         existing_unit = unit
 
-                if not existing_unit.upgraded and self.config["unitInformation"][UNIT_TYPE_TO_INDEX[existing_unit.unit_type]].get("upgrade", None) is not None:
+                if not existing_unit.upgraded and self.rules.can_upgrade(existing_unit.unit_type):
+                    BITS, CORES = self.BITS, self.CORES
                     costs = self.type_cost(existing_unit.unit_type, True)
                     resources = self.get_resources()
                     if resources[CORES] >= costs[CORES] and resources[BITS] >= costs[BITS]:
                         self.__set_resource(CORES, 0 - costs[CORES])
                         self.__set_resource(BITS, 0 - costs[BITS])
                         existing_unit.upgrade()
-                        self._build_stack.append((UPGRADE, x, y))
+                        self._build_stack.append((self.UPGRADE, x, y))
+                        self.game_map._tile_changed(x, y)
                         spawned_units += 1
             else:
                 self.warn("Could not upgrade a unit from {}. Location has no firewall or is enemy territory.".format(location))
@@ -488,8 +518,52 @@ class GameState:
         if target_edge is None:
             target_edge = self.get_target_edge(start_location)
 
+        if self.path_cache is not None:
+            path = self.path_cache.get(self.game_map.stationary_mask, start_location, target_edge)
+            if path is not None:
+                return path
+
         end_points = self.game_map.get_edge_locations(target_edge)
-        return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
+        path = self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
+        if self.path_cache is not None:
+            self.path_cache.put(self.game_map.stationary_mask, start_location, target_edge, path)
+        return path
+
+    def find_paths_to_edge_batch(self, start_locations, target_edge=None):
+        """Gets the paths units at several locations would take, sharing work between them.
+        Equivalent to calling find_path_to_edge for each location, but each pocket of pathable
+        space is only searched once per target edge, which makes scoring many spawn locations cheap.
+
+        Args:
+            start_locations: A list of locations of hypothetical units
+            target_edge: The edge the units want to reach. game_map.TOP_LEFT, game_map.BOTTOM_RIGHT, etc. Induced from each start_location if None.
+
+        Returns:
+            A list with the path for each start location, in the same order.
+            The entry is None for locations that are blocked by a stationary unit.
+
+        """
+        paths = [None] * len(start_locations)
+        starts_by_edge = {}
+        for i, start_location in enumerate(start_locations):
+            if self.contains_stationary_unit(start_location):
+                self.warn("Attempted to perform pathing from blocked starting location {}".format(start_location))
+                continue
+            edge = self.get_target_edge(start_location) if target_edge is None else target_edge
+            if self.path_cache is not None:
+                paths[i] = self.path_cache.get(self.game_map.stationary_mask, start_location, edge)
+                if paths[i] is not None:
+                    continue
+            starts_by_edge.setdefault(edge, []).append(i)
+
+        for edge, indices in starts_by_edge.items():
+            end_points = self.game_map.get_edge_locations(edge)
+            edge_paths = self._shortest_path_finder.navigate_multiple_starts([start_locations[i] for i in indices], end_points, self)
+            for i, path in zip(indices, edge_paths):
+                paths[i] = path
+                if self.path_cache is not None:
+                    self.path_cache.put(self.game_map.stationary_mask, start_locations[i], edge, path)
+        return paths
 
     def contains_stationary_unit(self, location):
         """Check if a location is blocked, return firewall unit if it is
@@ -501,10 +575,10 @@ class GameState:
             A firewall unit if there is a stationary unit at the location, False otherwise
             
         """
-        if not self.game_map.in_arena_bounds(location):
+        x, y = map(int, location)
+        if not arena.in_arena_bounds(x, y):
             self.warn('Checked for stationary unit outside of arena bounds')
             return False
-        x, y = map(int, location)
         for unit in self.game_map[x,y]:
             if unit.stationary:
                 return unit
@@ -528,6 +602,117 @@ class GameState:
         self.enable_warnings = not suppress
         self.game_map.enable_warnings = not suppress
 
+    def fork(self):
+        """Makes a hypothetical copy of this GameState to try out moves on, for example in a search over build plans.
+        The config and the pathfinder are shared, resources and the build and deploy stacks are copied, 
+        and the map is forked with GameMap.fork, so a location is only copied once one of the two states changes it.
+        Spawning, removing and upgrading on the fork does not affect this GameState, and calling submit_turn on it sends its own stacks.
+
+        Returns:
+            A new GameState for the same turn
+
+        """
+        child = copy.copy(self)
+        child.game_map = self.game_map.fork()
+        child._build_stack = list(self._build_stack)
+        child._deploy_stack = list(self._deploy_stack)
+        child._player_resources = [dict(resources) for resources in self._player_resources]
+        if self._threat_map is not None:
+            child._threat_map = self._threat_map.fork(child.game_map)
+        return child
+
+    @contextlib.contextmanager
+    def overlay(self, additions=(), removals=()):
+        """Layers hypothetical structures over the board for the duration of a with block, and puts the board back afterwards.
+
+        Pathing, range, targeting and threat queries made inside the block see the overlaid board. Only the locations
+        touched are changed, nothing is copied, and resources and the build and deploy stacks are left alone.
+        Every change to the touched locations is discarded on exit, even if the block raises, so do not spawn inside it.
+
+            with game_state.overlay(additions=[(FILTER, [12, 11]), (FILTER, [13, 11])]):
+                path = game_state.find_path_to_edge([13, 0])
+
+        Args:
+            additions: A list of (unit_type, location) or (unit_type, location, player_index) tuples of stationary units to place.
+                The player_index defaults to the owner of that half of the board. Units already at the location are replaced
+            removals: A list of locations to clear the stationary units from, applied before the additions
+
+        Yields:
+            This GameState
+
+        """
+        game_map = self.game_map
+        saved = {}
+        try:
+            for location in removals:
+                x, y = map(int, location)
+                if not arena.in_arena_bounds(x, y):
+                    self.warn("Could not remove a unit from {} in the overlay, it is out of bounds.".format(location))
+                    continue
+                if (x, y) not in saved:
+                    saved[x, y] = game_map._save_tile(x, y)
+                game_map[x, y] = [unit for unit in game_map[x, y] if not unit.stationary]
+            for addition in additions:
+                unit_type, location = addition[0], addition[1]
+                x, y = map(int, location)
+                if not arena.in_arena_bounds(x, y) or not self.rules.is_stationary(unit_type):
+                    self.warn("Could not add {} at {} in the overlay, only structures inside the arena can be added.".format(unit_type, location))
+                    continue
+                player_index = addition[2] if len(addition) > 2 else (0 if y < self.HALF_ARENA else 1)
+                if (x, y) not in saved:
+                    saved[x, y] = game_map._save_tile(x, y)
+                game_map.add_unit(unit_type, [x, y], player_index)
+            yield self
+        finally:
+            for (x, y), tile in saved.items():
+                game_map._restore_tile(x, y, tile)
+
+    def snapshot(self):
+        """Records the structures, health, resources and turn number of this GameState in a small read only TurnSnapshot.
+        Use it instead of copy.deepcopy to remember the previous turn, the config is shared instead of copied.
+
+        Returns:
+            A TurnSnapshot
+
+        """
+        return TurnSnapshot(self)
+
+    def diff(self, previous, player_index=None):
+        """Finds the structures built, destroyed, upgraded and damaged since an earlier snapshot
+
+        Args:
+            previous: A TurnSnapshot taken with snapshot(), for example at the end of the previous turn
+            player_index: Only report this player's structures, both players if None
+
+        Returns:
+            A SnapshotDiff with the locations of each kind of change
+
+        """
+        return self.snapshot().diff(previous, player_index)
+
+    def get_board_hash(self):
+        """Gets the Zobrist hash of the stationary units on the board, see GameMap.board_hash.
+        Spawning, upgrading and removing through this GameState update it, so it can key caches across calls and turns.
+
+        Returns:
+            A 64 bit int, equal for equal boards
+
+        """
+        return self.game_map.board_hash
+
+    def get_threat_map(self):
+        """Gets the ThreatMap for the current board, building it on first use.
+        Changes made through the GameMap and upgrades made through this GameState keep it up to date. Removals do not change it,
+        since structures flagged for removal keep fighting until the end of the round.
+
+        Returns:
+            A ThreatMap with the per tile damage each player's structures deal every frame
+
+        """
+        if self._threat_map is None:
+            self._threat_map = ThreatMap(self.game_map)
+        return self._threat_map
+
     def get_target(self, attacking_unit):
         """Returns target of given unit based on current map of the game board. 
         A Unit can often have many other units in range, and Units that attack do so once each frame.
@@ -547,8 +732,8 @@ class GameState:
             self.warn("Passed a {} to get_target as attacking_unit. Expected a GameUnit.".format(type(attacking_unit)))
             return
 
-        attacker_location = [attacking_unit.x, attacking_unit.y]
-        possible_locations = self.game_map.get_locations_in_range(attacker_location, attacking_unit.attackRange)
+        # The shared cached tuple, only read here
+        possible_locations = arena.locations_in_range(attacking_unit.x, attacking_unit.y, attacking_unit.attackRange, self.rules.get_hit_radius)
         target = None
         target_stationary = True
         target_distance = sys.maxsize
@@ -558,7 +743,7 @@ class GameState:
 
         for location in possible_locations:
             for unit in self.game_map[location]:
-                if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and is_stationary(unit.unit_type)) or (attacking_unit.damage_i == 0 and not(is_stationary(unit.unit_type))):
+                if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and unit.stationary) or (attacking_unit.damage_i == 0 and not unit.stationary):
                     continue
 
                 new_target = False
@@ -624,17 +809,7 @@ class GameState:
         if not self.game_map.in_arena_bounds(location):
             self.warn("Location {} is not in the arena bounds.".format(location))
 
-        attackers = []
-        """
-        Get locations in the range of DESTRUCTOR units
-        """
-        max_range = 0
-        for unit in self.config["unitInformation"]:
-            if unit.get('attackRange', 0) >= max_range:
-                max_range = unit.get('attackRange', 0)
-        possible_locations= self.game_map.get_locations_in_range(location, max_range)
-        for location_unit in possible_locations:
-            for unit in self.game_map[location_unit]:
-                if unit.damage_i + unit.damage_f > 0 and unit.player_index != player_index and self.game_map.distance_between_locations(location, location_unit) >= unit.attackRange:
-                    attackers.append(unit)
-        return attackers
+        x, y = map(int, location)
+        if not arena.in_arena_bounds(x, y):
+            return []
+        return self.get_threat_map().get_attackers([x, y], player_index)
@@ -1,25 +1,11 @@
 import heapq
 import math
 import sys
-import queue
+from array import array
+from collections import deque
+from . import arena
 from .util import debug_write
 
-class Node:
-    """A pathfinding node
-
-    Attributes :
-        * visited_idealness (bool): Have we visited this node during the idealness search step?
-        * visited_validate (bool): Have we visited this node during the validation step?
-        * blocked (bool): Is there a firewall at this node's location
-        * pathlength: The distance between this node and the target location
-
-    """
-    def __init__(self):
-        self.visited_idealness = False
-        self.visited_validate = False
-        self.blocked = False
-        self.pathlength = -1
-
 """
 This class helps with pathfinding. We guarantee the results will
 be accurate, but top players may want to write their own pathfinding
@@ -28,18 +14,53 @@ code to maximise time efficiency
 class ShortestPathFinder:
     """Handles pathfinding
 
+    The search state lives in flat arrays indexed by x * ARENA_SIZE + y that are allocated once 
+    and reused by every search. Both breadth first searches run on these integer indices with a deque 
+    and the neighbor table from arena.py, so no [x, y] lists or bounds checks are needed while searching. Instead of clearing them between searches, each entry is stamped 
+    with the generation of the search that wrote it, so starting a new search is a counter increment.
+    Walls are read from GameMap.stationary_mask and only rebuilt when that mask changes, 
+    so any number of queries against an unchanged board share a single wall scan.
+
+    In dynamic mode navigate_multiple_endpoints keeps the validation distance field of its last search. When the next query
+    is for the same end points and only a few tiles were blocked or unblocked since, the field is repaired around those tiles
+    instead of searched again, which makes "what if I build here" loops of add_unit, query, remove_unit cost about the size of the change.
+    A full search is still made when the start is not in the kept field, when the walls changed in more than REPAIR_LIMIT tiles,
+    or when a tile is unblocked next to a pocket that cannot reach its edge, since that can change the pocket's most ideal tile.
+
     Attributes :
         * HORIZONTAL (int): A constant representing a horizontal movement
         * VERTICAL (int): A constant representing a vertical movement
+        * ARENA_SIZE (int): The size of the arena
+        * generation (int): Incremented each time the map is initialized, entries stamped with an older generation are stale
+        * dynamic (bool): Whether navigate_multiple_endpoints repairs the distance field of its last search
+        * REPAIR_LIMIT (int): The most changed tiles a dynamic query repairs before searching again instead
+        * searches (int): The number of full searches made by dynamic queries
+        * repairs (int): The number of changed tiles dynamic queries repaired instead of searching again
 
         * game_state (:obj: GameState): The current gamestate
-        * game_map (:obj: GameMap): The current gamemap
 
     """
-    def __init__(self):
+    REPAIR_LIMIT = 8
+
+    def __init__(self, dynamic=False):
         self.HORIZONTAL = 1
         self.VERTICAL = 2
+        self.ARENA_SIZE = arena.ARENA_SIZE
         self.initialized = False
+        self.generation = 0
+        size = arena.TILE_COUNT
+        self._blocked = bytearray(size)
+        self._blocked_mask = 0
+        self._visited_idealness = array('l', [0]) * size
+        self._pocket = array('l', [0]) * size
+        self._visited_validate = array('l', [0]) * size
+        self._pathlength = array('l', [-1]) * size
+        self._neighbors = arena.NEIGHBORS
+        self._idealness_tables = {}
+        self.dynamic = dynamic
+        self.searches = 0
+        self.repairs = 0
+        self._field = None
 
     def initialize_map(self, game_state):
         """Initializes the map
@@ -47,10 +68,38 @@ class ShortestPathFinder:
         Args:
             game_state: A GameState object representing the gamestate we want to traverse
         """
-        #Initialize map 
+        #Invalidate everything written by the previous search
         self.initialized = True
         self.game_state = game_state
-        self.game_map = [[Node() for x in range(self.game_state.ARENA_SIZE)] for y in range(self.game_state.ARENA_SIZE)]
+        self.generation += 1
+
+    def _index(self, location):
+        return arena.tile_index(location[0], location[1])
+
+    def _location(self, index):
+        return arena.tile_location(index)
+
+    def _is_blocked(self, location):
+        return self._blocked[self._index(location)] == 1
+
+    def _load_walls(self, stationary_mask):
+        """Rebuilds the blocked array from a GameMap stationary mask, if it differs from the one loaded last
+        """
+        if stationary_mask == self._blocked_mask:
+            return
+        self._blocked_mask = stationary_mask
+        blocked = bytearray(len(self._blocked))
+        while stationary_mask:
+            lowest_bit = stationary_mask & -stationary_mask
+            blocked[lowest_bit.bit_length() - 1] = 1
+            stationary_mask ^= lowest_bit
+        self._blocked = blocked
+
+    def _get_pathlength(self, location):
+        index = self._index(location)
+        if self._visited_validate[index] != self.generation:
+            return -1
+        return self._pathlength[index]
 
     def navigate_multiple_endpoints(self, start_point, end_points, game_state):
         """Finds the path a unit would take to reach a set of endpoints
@@ -68,52 +117,211 @@ class ShortestPathFinder:
         if game_state.contains_stationary_unit(start_point):
             return
 
+        if self.dynamic:
+            return self._navigate_dynamic(start_point, end_points, game_state)
+        return self.navigate_multiple_starts([start_point], end_points, game_state)[0]
+
+    def navigate_multiple_starts(self, start_points, end_points, game_state):
+        """Finds the paths units at several start points would take to reach the same set of endpoints
+
+        Every start point in the same pocket of pathable space shares that pocket's most ideal tile,
+        and so also the distance field computed by the validation step. Each pocket is searched once,
+        after which every path is read off the shared field in time proportional to its length.
+
+        Args:
+            * start_points: A list of starting locations
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+
+        Returns:
+            A list with the path for each start point, in the same order, or None for start points that are blocked.
+
+        """
         #Initialize map 
         self.initialize_map(game_state)
         #Fill in walls
-        for location in self.game_state.game_map:
-            if self.game_state.contains_stationary_unit(location):
-                self.game_map[location[0]][location[1]].blocked = True
-        #Do pathfinding
-        ideal_endpoints = self._idealness_search(start_point, end_points)
-        self._validate(ideal_endpoints, end_points)
+        self._load_walls(game_state.game_map.stationary_mask)
+        #A new generation invalidates the field kept by dynamic queries
+        self._field = None
+
+        generation = self.generation
+        pocket_ideal_tiles = {}
+        validated = set()
+        paths = []
+        for start_point in start_points:
+            index = self._index(start_point)
+            if self._blocked[index]:
+                paths.append(None)
+                continue
+            #Do pathfinding, once per pocket
+            if not self._visited_idealness[index] == generation:
+                pocket_ideal_tiles[index] = self._idealness_search(start_point, end_points)
+            ideal_tile = pocket_ideal_tiles[self._pocket[index]]
+            validation_key = -1 if ideal_tile in end_points else self._index(ideal_tile)
+            if validation_key not in validated:
+                validated.add(validation_key)
+                self._validate(ideal_tile, end_points)
+            paths.append(self._get_path(start_point, end_points))
+        return paths
+
+    def _navigate_dynamic(self, start_point, end_points, game_state):
+        """navigate_multiple_endpoints in dynamic mode, repairing the kept distance field when it can
+        """
+        end_indices = tuple(self._index(location) for location in end_points)
+        stationary_mask = game_state.game_map.stationary_mask
+        changed = stationary_mask ^ self._blocked_mask
+        field = self._field
+        if field is not None and field[0] == end_indices and arena.popcount(changed) <= self.REPAIR_LIMIT:
+            self.game_state = game_state
+            reaches_edge = field[1]
+            seeds = field[2]
+            for index in arena.mask_indices(changed):
+                if stationary_mask >> index & 1:
+                    if not reaches_edge and index in seeds:
+                        # The pocket lost its most ideal tile
+                        field = None
+                        break
+                    self._repair_blocked(index, seeds)
+                elif not self._repair_unblocked(index, seeds) and not reaches_edge:
+                    # The pocket grew, it may now hold a more ideal tile or an edge
+                    field = None
+                    break
+                self.repairs += 1
+            if field is not None and self._visited_validate[self._index(start_point)] == self.generation:
+                return self._get_path(start_point, end_points)
+
+        self.searches += 1
+        self.initialize_map(game_state)
+        self._load_walls(stationary_mask)
+        ideal_tile = self._idealness_search(start_point, end_points)
+        self._validate(ideal_tile, end_points)
+        reaches_edge = ideal_tile in end_points
+        seeds = frozenset(end_indices) if reaches_edge else frozenset([self._index(ideal_tile)])
+        self._field = (end_indices, reaches_edge, seeds)
         return self._get_path(start_point, end_points)
 
+    def _repair_blocked(self, index, seeds):
+        """Updates the kept distance field after index became blocked.
+        The tiles whose every shortest route ran through index are found in order of distance,
+        then given their new distances from the rest of the field with a search over just those tiles.
+        """
+        neighbors = self._neighbors
+        blocked = self._blocked
+        visited = self._visited_validate
+        pathlength = self._pathlength
+        generation = self.generation
+
+        blocked[index] = 1
+        self._blocked_mask |= 1 << index
+        if visited[index] != generation:
+            return
+        # Seeds keep their pathlength of 0 when blocked, they just stop leading anywhere
+        if index not in seeds:
+            visited[index] = 0
+
+        affected = set()
+        current = deque(neighbor for neighbor in neighbors[index]
+                        if not blocked[neighbor] and visited[neighbor] == generation and pathlength[neighbor] == pathlength[index] + 1)
+        while current:
+            tile = current.popleft()
+            if tile in affected or tile in seeds:
+                continue
+            parent_length = pathlength[tile] - 1
+            if any(not blocked[neighbor] and visited[neighbor] == generation and neighbor not in affected
+                   and pathlength[neighbor] == parent_length for neighbor in neighbors[tile]):
+                continue
+            affected.add(tile)
+            current.extend(neighbor for neighbor in neighbors[tile]
+                           if not blocked[neighbor] and visited[neighbor] == generation and pathlength[neighbor] == pathlength[tile] + 1)
+
+        for tile in affected:
+            visited[tile] = 0
+        frontier = []
+        for tile in affected:
+            lengths = [pathlength[neighbor] for neighbor in neighbors[tile] if not blocked[neighbor] and visited[neighbor] == generation]
+            if lengths:
+                heapq.heappush(frontier, (min(lengths) + 1, tile))
+        while frontier:
+            length, tile = heapq.heappop(frontier)
+            if visited[tile] == generation:
+                continue
+            visited[tile] = generation
+            pathlength[tile] = length
+            for neighbor in neighbors[tile]:
+                if neighbor in affected and visited[neighbor] != generation:
+                    heapq.heappush(frontier, (length + 1, neighbor))
+
+    def _repair_unblocked(self, index, seeds):
+        """Updates the kept distance field after index became pathable, spreading the shorter distances it opens up.
+
+        Returns:
+            True if the field did not reach index, so the field and its pocket are unchanged
+        """
+        neighbors = self._neighbors
+        blocked = self._blocked
+        visited = self._visited_validate
+        pathlength = self._pathlength
+        generation = self.generation
+
+        blocked[index] = 0
+        self._blocked_mask &= ~(1 << index)
+        if index not in seeds:
+            lengths = [pathlength[neighbor] for neighbor in neighbors[index] if not blocked[neighbor] and visited[neighbor] == generation]
+            if not lengths:
+                return True
+            visited[index] = generation
+            pathlength[index] = min(lengths) + 1
+
+        current = deque([index])
+        while current:
+            tile = current.popleft()
+            next_pathlength = pathlength[tile] + 1
+            for neighbor in neighbors[tile]:
+                if blocked[neighbor]:
+                    continue
+                if visited[neighbor] != generation or pathlength[neighbor] > next_pathlength:
+                    visited[neighbor] = generation
+                    pathlength[neighbor] = next_pathlength
+                    current.append(neighbor)
+        return False
+
     def _idealness_search(self, start, end_points):
         """
         Finds the most ideal tile in our 'pocket' of pathable space. 
         The edge if it is available, or the best self destruct location otherwise
         """
-        current = queue.Queue()
-        current.put(start)
-        best_idealness = self._get_idealness(start, end_points)
-        self.game_map[start[0]][start[1]].visited_idealness = True
-        most_ideal = start
-
-        while not current.empty():
-            search_location = current.get()
-            for neighbor in self._get_neighbors(search_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        neighbors = self._neighbors
+        blocked = self._blocked
+        visited = self._visited_idealness
+        pocket_of = self._pocket
+        generation = self.generation
+        idealness = self._get_idealness_table(end_points)
+        end_indices = set(self._index(location) for location in end_points)
+
+        pocket = self._index(start)
+        visited[pocket] = generation
+        pocket_of[pocket] = pocket
+        best_idealness = sys.maxsize if pocket in end_indices else idealness[pocket]
+        most_ideal = pocket
+
+        current = deque([pocket])
+        while current:
+            search_index = current.popleft()
+            for neighbor in neighbors[search_index]:
+                if blocked[neighbor]:
                     continue
 
-                x, y = neighbor
-                current_idealness = self._get_idealness(neighbor, end_points)
-
+                current_idealness = sys.maxsize if neighbor in end_indices else idealness[neighbor]
                 if current_idealness > best_idealness:
                     best_idealness = current_idealness
                     most_ideal = neighbor
 
-                if not self.game_map[x][y].visited_idealness and not self.game_map[x][y].blocked:
-                    self.game_map[x][y].visited_idealness = True
-                    current.put(neighbor)
-
-        return most_ideal
+                if not visited[neighbor] == generation:
+                    visited[neighbor] = generation
+                    pocket_of[neighbor] = pocket
+                    current.append(neighbor)
 
-    def _get_neighbors(self, location):
-        """Get the locations adjacent to a location
-        """
-        x, y = location
-        return [[x, y + 1], [x, y - 1], [x + 1, y], [x - 1, y]]
+        return self._location(most_ideal)
 
     def _get_direction_from_endpoints(self, end_points):
         """Prints a message to the games debug output
@@ -128,9 +336,9 @@ class ShortestPathFinder:
         point = end_points[0]
         x, y = point
         direction = [1, 1]
-        if x < self.game_state.HALF_ARENA:
+        if x < arena.HALF_ARENA:
            direction[0] = -1
-        if y < self.game_state.HALF_ARENA:
+        if y < arena.HALF_ARENA:
             direction[1] = -1
         return direction
 
@@ -144,51 +352,64 @@ class ShortestPathFinder:
         if location in end_points:
             return sys.maxsize
 
-        direction = self._get_direction_from_endpoints(end_points)
-
-        idealness = 0
-        if direction[1] == 1:
-            idealness += 28 * location[1]
-        else: 
-            idealness += 28 * (27 - location[1])
-        if direction[0] == 1:
-            idealness += location[0]
-        else: 
-            idealness += (27 - location[0])
+        return self._get_idealness_table(end_points)[self._index(location)]
 
-        return idealness
+    def _get_idealness_table(self, end_points):
+        """The idealness of every tile index for non endpoint tiles, computed once per direction
+        """
+        direction = tuple(self._get_direction_from_endpoints(end_points))
+        table = self._idealness_tables.get(direction)
+        if table is None:
+            table = array('l', [0]) * arena.TILE_COUNT
+            for index, (x, y) in enumerate(arena.LOCATIONS):
+                idealness = 0
+                if direction[1] == 1:
+                    idealness += 28 * y
+                else: 
+                    idealness += 28 * (27 - y)
+                if direction[0] == 1:
+                    idealness += x
+                else: 
+                    idealness += (27 - x)
+                table[index] = idealness
+            self._idealness_tables[direction] = table
+        return table
 
     def _validate(self, ideal_tile, end_points):
         """Breadth first search of the grid, setting the pathlengths of each node
 
         """
         #VALDIATION
+        neighbors = self._neighbors
+        blocked = self._blocked
+        visited = self._visited_validate
+        pathlength = self._pathlength
+        generation = self.generation
+
         #Add our most ideal tiles to current
-        current = queue.Queue()
         if ideal_tile in end_points:
-            for location in end_points:
-               current.put(location)
-               #Set current pathlength to 0
-               self.game_map[location[0]][location[1]].pathlength = 0
-               self.game_map[location[0]][location[1]].visited_validate = True
+            seeds = [self._index(location) for location in end_points]
         else:
-            current.put(ideal_tile)
-            self.game_map[ideal_tile[0]][ideal_tile[1]].pathlength = 0
-            self.game_map[ideal_tile[0]][ideal_tile[1]].visited_validate = True
+            seeds = [self._index(ideal_tile)]
+        for index in seeds:
+            #Set current pathlength to 0
+            pathlength[index] = 0
+            visited[index] = generation
+        current = deque(seeds)
 
         #While current is not empty
-        while not current.empty():
-            current_location = current.get()
-            current_node = self.game_map[current_location[0]][current_location[1]]
-            for neighbor in self._get_neighbors(current_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        while current:
+            current_index = current.popleft()
+            if blocked[current_index]:
+                continue
+            next_pathlength = pathlength[current_index] + 1
+            for neighbor in neighbors[current_index]:
+                if blocked[neighbor] or visited[neighbor] == generation:
                     continue
 
-                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
-                if not neighbor_node.visited_validate and not current_node.blocked:
-                    neighbor_node.pathlength = current_node.pathlength + 1
-                    neighbor_node.visited_validate = True
-                    current.put(neighbor)
+                pathlength[neighbor] = next_pathlength
+                visited[neighbor] = generation
+                current.append(neighbor)
 
         #debug_write("Print after validate")
         #self.print_map()
@@ -203,8 +424,8 @@ class ShortestPathFinder:
         current = start_point
         move_direction = 0
 
-        while not self.game_map[current[0]][current[1]].pathlength == 0:
-            #debug_write("current tile {} has cost {}".format(current, self.game_map[current[0]][current[1]].pathlength))
+        while not self._get_pathlength(current) == 0:
+            #debug_write("current tile {} has cost {}".format(current, self._get_pathlength(current)))
             next_move = self._choose_next_move(current, move_direction, end_points)
             #debug_write(next_move)
 
@@ -221,19 +442,17 @@ class ShortestPathFinder:
     def _choose_next_move(self, current_point, previous_move_direction, end_points):
         """Given the current location and adjacent locations, return the best 'next step' for a given unit to take
         """
-        neighbors = self._get_neighbors(current_point)
-        #debug_write("Unit at {} previously moved {} and has these neighbors {}".format(current_point, previous_move_direction, neighbors))
+        generation = self.generation
 
         ideal_neighbor = current_point
-        best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
-        for neighbor in neighbors:
+        best_pathlength = self._get_pathlength(current_point)
+        for neighbor_index in self._neighbors[self._index(current_point)]:
             #debug_write("Comparing champ {} and contender {}".format(ideal_neighbor, neighbor))
-            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+            if self._blocked[neighbor_index]:
                 continue
 
             new_best = False
-            x, y = neighbor
-            current_pathlength = self.game_map[x][y].pathlength
+            current_pathlength = self._pathlength[neighbor_index] if self._visited_validate[neighbor_index] == generation else -1
 
             #Filter by pathlength
             if current_pathlength > best_pathlength:
@@ -242,6 +461,8 @@ class ShortestPathFinder:
                 #debug_write("Contender has better pathlength at {} vs champs {}".format(current_pathlength, best_pathlength))
                 new_best = True
 
+            neighbor = self._location(neighbor_index)
+
             #Filter by direction based on prev move
             if not new_best and not self._better_direction(current_point, neighbor, ideal_neighbor, previous_move_direction, end_points):
                 continue
@@ -299,9 +520,10 @@ class ShortestPathFinder:
 
         for y in range(28):
             for x in range(28):
-                node = self.game_map[x][28 - y - 1]
-                if not node.blocked and not node.pathlength == -1:
-                    self._print_justified(node.pathlength)
+                location = [x, 28 - y - 1]
+                pathlength = self._get_pathlength(location)
+                if not self._is_blocked(location) and not pathlength == -1:
+                    self._print_justified(pathlength)
                 else:
                     sys.stderr.write("   ")
             debug_write("")
@@ -0,0 +1,212 @@
+import itertools
+import math
+import multiprocessing
+from array import array
+
+from . import arena
+from .game_state import GameState
+from .rules import RuleSet
+from .simulator import ActionSimulator
+
+_WORKER_CONFIGS = {}
+_WORKER_STATE = {}
+
+
+def _init_worker(config_id, config):
+    _WORKER_CONFIGS[config_id] = config
+
+
+def _score_chunk(task):
+    snapshot, candidates, score_function = task
+    if _WORKER_STATE.get("key") != snapshot.key:
+        _WORKER_STATE["key"] = snapshot.key
+        _WORKER_STATE["state"] = snapshot.to_game_state(_WORKER_CONFIGS[snapshot.config_id])
+    state = _WORKER_STATE["state"]
+    return [score_function(state.fork(), candidate) for candidate in candidates]
+
+
+def simulated_damage(game_state, candidate):
+    """Scores a deploy by simulating the action phase with it, the default score of PlanEvaluator
+
+    Args:
+        game_state: A GameState that can be changed
+        candidate: A (unit_type, location, num) tuple
+
+    Returns:
+        A (enemy health lost, damage dealt) tuple, higher is better
+    """
+    unit_type, location, num = candidate
+    result = ActionSimulator(game_state).simulate([(unit_type, location, num, 0)])
+    return (game_state.enemy_health - result.health[1], result.damage_dealt[0])
+
+
+class StateSnapshot:
+    """A small picklable copy of a GameState, with the units, health and resources but without the config.
+    Processes that were given the config when they started rebuild the GameState from it with to_game_state.
+
+    The stationary units are copied out of the map's BoardArrays as flat per tile arrays, which pickle as a few bytes strings,
+    so their health is the health BoardArrays recorded when each tile last changed. The rare information units are listed one by one.
+
+    Attributes :
+        * config_id (int): Identifies the config the snapshot belongs to
+        * key (tuple): Identifies the snapshot, processes keep the last GameState they rebuilt under it
+        * turn_number (int): The turn number
+        * stats (list): [health, cores, bits, time] for each player
+        * unit_types (tuple): The unit types, unit_type[index] is an index into it
+        * unit_type (array): The index in unit_types of the stationary unit on each tile, -1 if there is none
+        * owner (array): The player_index of the stationary unit on each tile, -1 if there is none
+        * health (array): The health of the stationary unit on each tile
+        * upgraded (bytes): 1 if the stationary unit on the tile is upgraded
+        * pending_removal (bytes): 1 if the stationary unit on the tile is flagged for removal
+        * structures (int): The region mask of the tiles holding a stationary unit, see arena.py
+        * mobile_units (list): A (player_index, unit_type, x, y, health) tuple for each information unit
+
+    """
+    __counter = itertools.count()
+
+    def __init__(self, game_state, config_id):
+        """ Copies the data of a GameState
+
+        Args:
+            * game_state (:obj: GameState): The state to copy
+            * config_id (int): Identifies game_state.config in the processes the snapshot is sent to
+
+        """
+        self.config_id = config_id
+        self.key = (config_id, next(StateSnapshot.__counter))
+        self.turn_number = game_state.turn_number
+        self.stats = [
+            [game_state.my_health, game_state.get_resource(game_state.CORES, 0), game_state.get_resource(game_state.BITS, 0), game_state.my_time],
+            [game_state.enemy_health, game_state.get_resource(game_state.CORES, 1), game_state.get_resource(game_state.BITS, 1), game_state.enemy_time]]
+        game_map = game_state.game_map
+        arrays = game_map.get_arrays()
+        self.unit_types = arrays.unit_types
+        self.unit_type = array('b', arrays.unit_type)
+        self.owner = array('b', arrays.owner)
+        self.health = array('d', arrays.health)
+        self.upgraded = bytes(arrays.upgraded)
+        self.pending_removal = bytes(arrays.pending_removal)
+        self.structures = arrays.stationary_mask()
+        self.mobile_units = []
+        for index in arena.mask_indices(arrays.mobile_mask()):
+            x, y = arena.LOCATIONS[index]
+            self.mobile_units.extend((unit.player_index, unit.unit_type, x, y, unit.health)
+                                     for unit in game_map[x, y] if not unit.stationary)
+
+    def to_game_state(self, config):
+        """Rebuilds the GameState
+
+        Args:
+            config (JSON): The config the snapshot was taken with
+
+        Returns:
+            A new GameState
+        """
+        rules = RuleSet.for_config(config)
+        type_index = rules.UNIT_TYPE_TO_INDEX
+        # Older configs have no UPGRADE, or even REMOVE, entry
+        remove_index, upgrade_index = type_index.get(rules.REMOVE), type_index.get(rules.UPGRADE)
+        units = [[[] for _ in config["unitInformation"]] for _ in range(2)]
+        for index in arena.mask_indices(self.structures):
+            x, y = arena.LOCATIONS[index]
+            player_units = units[self.owner[index]]
+            player_units[type_index[self.unit_types[self.unit_type[index]]]].append([x, y, self.health[index], ""])
+            if self.pending_removal[index] and remove_index is not None:
+                player_units[remove_index].append([x, y, 0, ""])
+            if self.upgraded[index] and upgrade_index is not None:
+                player_units[upgrade_index].append([x, y, 0, ""])
+        for player_index, unit_type, x, y, health in self.mobile_units:
+            units[player_index][type_index[unit_type]].append([x, y, health, ""])
+        state = GameState(config, {
+            "turnInfo": [0, self.turn_number, 0],
+            "p1Stats": self.stats[0],
+            "p2Stats": self.stats[1],
+            "p1Units": units[0],
+            "p2Units": units[1],
+        })
+        state.suppress_warnings(True)
+        return state
+
+
+class PlanEvaluator:
+    """Scores candidate plans in parallel on a pool of processes that lives for the whole game.
+
+    Create it once in on_game_start, since starting processes is slow, and call close when the game ends.
+    The config is sent to each process once when the pool starts. For each call to score the GameState is
+    sent as a StateSnapshot, once per chunk of candidates, and each process scores its candidates on forks of the rebuilt state.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * config_id (int): The id snapshots of states with this config are sent with
+        * processes (int): The number of processes in the pool
+
+    """
+    def __init__(self, config, processes=None):
+        """ Starts the process pool
+
+        Args:
+            * config (JSON): Contains information about the game
+            * processes (int): How many processes to start, by default one per core
+
+        """
+        self.config = config
+        self.config_id = id(config)
+        self.processes = processes or multiprocessing.cpu_count()
+        self._pool = multiprocessing.Pool(self.processes, initializer=_init_worker, initargs=(self.config_id, config))
+
+    @staticmethod
+    def plan_grid(unit_types, locations, counts):
+        """Every combination of a unit type, a spawn location and a number of units
+
+        Args:
+            unit_types: The unit types to try
+            locations: The locations to try
+            counts: The numbers of units to try
+
+        Returns:
+            A list of (unit_type, location, num) tuples
+        """
+        return [(unit_type, location, num) for unit_type in unit_types for location in locations for num in counts]
+
+    def score(self, game_state, candidates, score_function=simulated_damage):
+        """Scores every candidate plan on the current state
+
+        Args:
+            game_state: The GameState to score the candidates on, it is not changed
+            candidates: A list of candidate plans, for example from plan_grid
+            score_function: A function defined at module level, so it can be pickled, taking a GameState that can be changed and a candidate
+
+        Returns:
+            The scores, in the order of candidates
+        """
+        candidates = list(candidates)
+        if not candidates:
+            return []
+        snapshot = StateSnapshot(game_state, self.config_id)
+        chunk_size = max(1, math.ceil(len(candidates) / (self.processes * 4)))
+        tasks = [(snapshot, candidates[i:i + chunk_size], score_function) for i in range(0, len(candidates), chunk_size)]
+        return [score for chunk in self._pool.map(_score_chunk, tasks) for score in chunk]
+
+    def best(self, game_state, candidates, score_function=simulated_damage):
+        """Finds the candidate plan with the highest score
+
+        Args:
+            game_state: The GameState to score the candidates on, it is not changed
+            candidates: A list of candidate plans, for example from plan_grid
+            score_function: See score
+
+        Returns:
+            The best candidate and its score, or (None, None) if there are no candidates
+        """
+        candidates = list(candidates)
+        scores = self.score(game_state, candidates, score_function)
+        if not scores:
+            return None, None
+        best_index = max(range(len(scores)), key=scores.__getitem__)
+        return candidates[best_index], scores[best_index]
+
+    def close(self):
+        """Stops the processes
+        """
+        self._pool.terminate()
+        self._pool.join()
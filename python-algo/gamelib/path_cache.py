@@ -0,0 +1,73 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    """A bounded cache of pathfinding results, shared by every GameState it is given to, across calls and turns.
+
+    Paths only depend on which tiles are blocked, so entries are keyed by GameMap.stationary_mask together with the start
+    location and the target edge. Any change to the walls through add_unit, remove_unit or spawning gives a new key,
+    so entries for an old board are never returned and are evicted once they are the least recently used.
+
+    Create one in on_game_start and set it as path_cache on each turn's GameState to have find_path_to_edge
+    and find_paths_to_edge_batch use it.
+
+    Attributes :
+        * max_size (int): How many paths are kept before evicting the least recently used
+        * hits (int): The number of lookups that found a cached path
+        * misses (int): The number of lookups that did not
+
+    """
+    def __init__(self, max_size=1024):
+        """ Creates an empty cache
+
+        Args:
+            * max_size (int): How many paths to keep
+
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._paths = OrderedDict()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def get(self, stationary_mask, start_location, target_edge):
+        """Looks up a path
+
+        Args:
+            stationary_mask: The GameMap.stationary_mask of the board
+            start_location: The location the path starts at
+            target_edge: The edge the path leads to
+
+        Returns:
+            A copy of the cached path, or None if it is not cached
+        """
+        key = (stationary_mask, start_location[0], start_location[1], target_edge)
+        path = self._paths.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self._paths.move_to_end(key)
+        self.hits += 1
+        return [list(location) for location in path]
+
+    def put(self, stationary_mask, start_location, target_edge, path):
+        """Stores a path, evicting the least recently used one if the cache is full
+
+        Args:
+            stationary_mask: The GameMap.stationary_mask of the board
+            start_location: The location the path starts at
+            target_edge: The edge the path leads to
+            path: The path found on that board
+        """
+        key = (stationary_mask, start_location[0], start_location[1], target_edge)
+        self._paths[key] = tuple((x, y) for x, y in path)
+        self._paths.move_to_end(key)
+        while len(self._paths) > self.max_size:
+            self._paths.popitem(last=False)
+
+    def clear(self):
+        """Drops every cached path, the counters are kept
+        """
+        self._paths.clear()
@@ -0,0 +1,204 @@
+from types import MappingProxyType
+
+
+class UnitStats:
+    """The stats every unit of one type has, read from the config once and shared by all of them.
+    Each type has one record for the base unit and, through upgraded_stats, one for the upgraded unit.
+    Records are shared, so never change them, use replace to get a changed copy.
+
+    Attributes :
+        * unit_type (string): The type the stats are for
+        * config (JSON): The config the stats were read from
+        * upgraded (bool): Whether these are the stats of an upgraded unit
+        * upgraded_stats (:obj: UnitStats): The stats after an upgrade, itself if upgraded is True
+        * stationary, speed, damage_f, damage_i, attackRange, shieldRange, max_health, shieldPerUnit, cost: See GameUnit
+
+    """
+    __slots__ = ("unit_type", "config", "upgraded", "upgraded_stats", "stationary", "speed", "damage_f", "damage_i",
+                 "attackRange", "shieldRange", "max_health", "shieldPerUnit", "cost")
+
+    def __init__(self, unit_type, config, type_config, base=None):
+        """ Reads the stats of a type, or of its upgrade if base is given
+
+        Args:
+            * unit_type (string): The unit type
+            * config (JSON): Contains information about the game
+            * type_config (dict): The unitInformation entry of the type, or its upgrade entry
+            * base (:obj: UnitStats): The stats of the unit before the upgrade
+
+        """
+        self.unit_type = unit_type
+        self.config = config
+        self.upgraded = base is not None
+        self.upgraded_stats = self
+        if base is None:
+            self.stationary = type_config["unitCategory"] == 0
+            self.speed = type_config.get("speed", 0)
+            self.damage_f = type_config.get("attackDamageTower", 0)
+            self.damage_i = type_config.get("attackDamageWalker", 0)
+            self.attackRange = type_config.get("attackRange", 0)
+            self.shieldRange = type_config.get("shieldRange", 0)
+            self.max_health = type_config.get("startHealth", 0)
+            self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
+            self.cost = (type_config.get("cost1", 0), type_config.get("cost2", 0))
+        else:
+            self.stationary = base.stationary
+            self.speed = type_config.get("speed", base.speed)
+            self.damage_f = type_config.get("attackDamageTower", base.damage_f)
+            self.damage_i = type_config.get("attackDamageWalker", base.damage_i)
+            self.attackRange = type_config.get("attackRange", base.attackRange)
+            self.shieldRange = type_config.get("shieldRange", base.shieldRange)
+            self.max_health = type_config.get("startHealth", base.max_health)
+            self.shieldPerUnit = type_config.get("shieldPerUnit", base.shieldPerUnit)
+            self.cost = (type_config.get("cost1", 0) + base.cost[0], type_config.get("cost2", 0) + base.cost[1])
+
+    def replace(self, **changes):
+        """A copy of this record with some stats changed, for a unit whose stats differ from the rest of its type
+
+        Args:
+            changes: The new value of each stat to change
+
+        Returns:
+            A new UnitStats, its upgraded_stats is the same as this record's
+        """
+        stats = UnitStats.__new__(UnitStats)
+        for name in UnitStats.__slots__:
+            setattr(stats, name, getattr(self, name))
+        for name, value in changes.items():
+            setattr(stats, name, value)
+        if self.upgraded_stats is self:
+            stats.upgraded_stats = stats
+        return stats
+
+
+class RuleSet:
+    """The unit types and rules of one game config, read from it once and never changed afterwards.
+
+    GameState, GameMap and GameUnit each hold the RuleSet of their config instead of reading module globals,
+    so states built from different configs can be used side by side and from several threads.
+    Use RuleSet.for_config to get the shared RuleSet of a config.
+
+    Attributes :
+        * config (JSON): The config the rules were read from
+        * FILTER, ENCRYPTOR, DESTRUCTOR, PING, EMP, SCRAMBLER, REMOVE, UPGRADE (str): The shorthands of each unit type and action.
+          UPGRADE is None for configs without upgrades
+        * UNIT_TYPE_TO_INDEX (mapping): Maps a unit type to its index in the config's unitInformation
+        * FIREWALL_TYPES (tuple): The firewall unit types
+        * ALL_UNITS (tuple): Every unit type that can be spawned
+        * BITS (int): A constant representing the bits resource, used in the get_resource function
+        * CORES (int): A constant representing the cores resource, used in the get_resource function
+        * get_hit_radius (float): How far beyond its range a unit can reach a location
+        * unit_stats (mapping): Maps a unit type to the UnitStats of the base unit
+
+    """
+    BITS = 1
+    CORES = 0
+
+    __slots__ = ("config", "FILTER", "ENCRYPTOR", "DESTRUCTOR", "PING", "EMP", "SCRAMBLER", "REMOVE", "UPGRADE",
+                 "UNIT_TYPE_TO_INDEX", "FIREWALL_TYPES", "ALL_UNITS", "get_hit_radius", "unit_stats",
+                 "_firewall_set", "_costs", "_frozen")
+
+    __cache = {}
+    __CACHE_SIZE = 8
+
+    @classmethod
+    def for_config(cls, config):
+        """Gets the RuleSet of a config, reading the config the first time it is seen
+
+        Args:
+            config (JSON): Contains information about the game, or a RuleSet which is returned as is
+
+        Returns:
+            The RuleSet shared by everything built from config
+        """
+        if type(config) is RuleSet:
+            return config
+        entry = cls.__cache.get(id(config))
+        if entry is not None and entry[0] is config:
+            return entry[1]
+        rules = cls(config)
+        if len(cls.__cache) >= cls.__CACHE_SIZE:
+            cls.__cache.clear()
+        # The config is kept alive with its rules, so its id cannot be reused by another config
+        cls.__cache[id(config)] = (config, rules)
+        return rules
+
+    def __init__(self, config):
+        """ Reads the rules out of a config. Prefer RuleSet.for_config, which reuses the rules of a config already seen
+
+        Args:
+            * config (JSON): Contains information about the game
+
+        """
+        unit_information = config["unitInformation"]
+        shorthands = [unit_info["shorthand"] for unit_info in unit_information]
+        self.config = config
+        # Configs from before upgrades were added have no UPGRADE entry
+        padded = shorthands[:8] + [None] * (8 - len(shorthands))
+        self.FILTER, self.ENCRYPTOR, self.DESTRUCTOR, self.PING, self.EMP, self.SCRAMBLER, self.REMOVE, self.UPGRADE = padded
+        self.UNIT_TYPE_TO_INDEX = MappingProxyType({shorthand: index for index, shorthand in enumerate(shorthands)})
+        self.FIREWALL_TYPES = (self.FILTER, self.ENCRYPTOR, self.DESTRUCTOR)
+        self.ALL_UNITS = (self.PING, self.EMP, self.SCRAMBLER, self.FILTER, self.ENCRYPTOR, self.DESTRUCTOR)
+        self.get_hit_radius = unit_information[0].get("getHitRadius", 0)
+        self._firewall_set = frozenset(self.FIREWALL_TYPES)
+
+        unit_stats = {}
+        costs = {}
+        for unit_type, type_config in zip(shorthands, unit_information):
+            if "unitCategory" not in type_config:
+                continue
+            stats = UnitStats(unit_type, config, type_config)
+            stats.upgraded_stats = UnitStats(unit_type, config, type_config.get("upgrade", {}), stats)
+            unit_stats[unit_type] = stats
+            upgrade_config = type_config.get("upgrade", {})
+            costs[unit_type, False] = stats.cost
+            costs[unit_type, True] = (upgrade_config.get("cost1", stats.cost[self.CORES]), upgrade_config.get("cost2", stats.cost[self.BITS]))
+        self.unit_stats = MappingProxyType(unit_stats)
+        self._costs = MappingProxyType(costs)
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("RuleSet is immutable")
+        super().__setattr__(name, value)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # Immutable, so copies of a GameState keep sharing it
+        return self
+
+    def __reduce__(self):
+        return (RuleSet.for_config, (self.config,))
+
+    def is_stationary(self, unit_type):
+        """
+            Args:
+                unit_type: A unit type
+
+            Returns:
+                Boolean, True if the unit is stationary, False otherwise.
+        """
+        return unit_type in self._firewall_set
+
+    def type_config(self, unit_type):
+        """The unitInformation entry of a unit type
+        """
+        return self.config["unitInformation"][self.UNIT_TYPE_TO_INDEX[unit_type]]
+
+    def can_upgrade(self, unit_type):
+        """Whether the config defines an upgrade for a unit type
+        """
+        return self.type_config(unit_type).get("upgrade", None) is not None
+
+    def type_cost(self, unit_type, upgrade=False):
+        """The cost of a unit type, or of upgrading it, as a tuple (CORES, BITS)
+        """
+        return self._costs[unit_type, upgrade]
+
+    def attack_range(self, unit_type, upgraded=False):
+        """The attackRange of a unit type, or of the upgraded unit
+        """
+        stats = self.unit_stats[unit_type]
+        return stats.upgraded_stats.attackRange if upgraded else stats.attackRange
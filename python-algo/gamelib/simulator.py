@@ -0,0 +1,281 @@
+import copy
+import math
+
+from . import arena
+from .game_map import GameMap
+from .navigation import ShortestPathFinder
+from .unit import GameUnit
+
+
+class SimulationResult:
+    """The outcome of a simulated action phase
+
+    Attributes :
+        * health ([float, float]): Each player's health at the end of the round, [you, your opponent]
+        * breaches ([int, int]): The number of information units each player scored with
+        * cores_gained ([float, float]): The cores each player earned from breaches
+        * damage_dealt ([float, float]): The damage each player's units dealt to enemy units, including self destructs
+        * destroyed (list): The stationary GameUnits destroyed during the round, at the location they died
+        * frames (int): The number of frames simulated
+
+    """
+    def __init__(self, health):
+        self.health = list(health)
+        self.breaches = [0, 0]
+        self.cores_gained = [0.0, 0.0]
+        self.damage_dealt = [0.0, 0.0]
+        self.destroyed = []
+        self.frames = 0
+
+    def __repr__(self):
+        return "SimulationResult(health={}, breaches={}, damage_dealt={}, destroyed={}, frames={})".format(
+            self.health, self.breaches, self.damage_dealt, len(self.destroyed), self.frames)
+
+
+class _Mover:
+    """An information unit taking part in a simulation, and where it is along its path"""
+
+    def __init__(self, unit, target_edge, end_points, frames_per_move):
+        self.unit = unit
+        self.target_edge = target_edge
+        self.end_indices = set(arena.tile_index(x, y) for x, y in end_points)
+        self.frames_per_move = frames_per_move
+        self.frames_until_move = frames_per_move
+        self.steps_taken = 0
+        self.path = None
+        self.step = 0
+        self.shielded_by = set()
+        self.shields = []
+
+
+class ActionSimulator:
+    """Simulates an action phase offline, frame by frame, without touching the GameState it was built from.
+
+    Each frame runs these steps in order:
+        1. Units that are due to move take one step along their path. A unit that reaches its target edge
+           breaches, a unit at the end of a path that stops short of the edge self destructs.
+        2. Shields already given decay by their encryptor's shieldDecay, then encryptors shield every friendly
+           information unit in shieldRange once. Decay only takes health above the unit's max_health, so shield
+           that was already lost to damage is not taken again.
+        3. Every armed unit attacks one target, chosen with the same priority as GameState.get_target.
+        4. Units without health are removed. If a structure was destroyed all units re-path.
+
+    The simulation is deterministic and follows the rules in the game config, but it is an approximation of the engine,
+    for example units start a fresh path instead of remembering their last move direction when they re-path.
+
+    Attributes :
+        * game_state (:obj: GameState): The state the simulations start from
+        * config (JSON): Contains information about the game
+        * rules (:obj: RuleSet): The unit types and rules read from config
+        * MAX_FRAMES (int): Simulations stop after this many frames even if units are still alive
+
+    """
+    MAX_FRAMES = 1000
+
+    def __init__(self, game_state):
+        """ Reads the per type rules the simulation needs out of the config
+
+        Args:
+            * game_state (:obj: GameState): The state the simulations start from, including any units you have already spawned
+
+        """
+        self.game_state = game_state
+        self.config = game_state.config
+        self.rules = game_state.rules
+        self._type_config = {unit_info["shorthand"]: unit_info for unit_info in self.config["unitInformation"]}
+        # Older configs give one shield decay for every encryptor in mechanics
+        self._default_shield_decay = self.config.get("mechanics", {}).get("shieldDecayPerFrame", 0)
+        self._get_hit_radius = self.rules.get_hit_radius
+        self._finder = ShortestPathFinder()
+        self.game_map = None
+
+    def simulate(self, deploys=()):
+        """Runs the action phase for the current board plus hypothetical deploys
+
+        Args:
+            * deploys: An iterable of (unit_type, location, num, player_index) tuples of information units to add before simulating
+
+        Returns:
+            A SimulationResult
+
+        """
+        self.game_map = GameMap(self.rules)
+        self.game_map.enable_warnings = False
+        structures = {}
+        movers = []
+        source_map = self.game_state.game_map
+        for index in arena.ARENA_TILES:
+            x, y = arena.LOCATIONS[index]
+            for unit in source_map[x, y]:
+                clone = copy.copy(unit)
+                if unit.stationary:
+                    self.game_map._place_unit(clone)
+                    structures[index] = clone
+                else:
+                    movers.append(self.__make_mover(clone))
+        for unit_type, location, num, player_index in deploys:
+            for _ in range(num):
+                movers.append(self.__make_mover(GameUnit(unit_type, self.rules, player_index, None, location[0], location[1])))
+
+        result = SimulationResult([self.game_state.my_health, self.game_state.enemy_health])
+        repath = True
+        while movers and result.frames < self.MAX_FRAMES:
+            result.frames += 1
+            if repath:
+                self.__repath(movers)
+                repath = False
+
+            movers = self.__move(movers, structures, result)
+            movers_by_tile = {}
+            for mover in movers:
+                movers_by_tile.setdefault(arena.tile_index(mover.unit.x, mover.unit.y), []).append(mover)
+
+            self.__decay_shields(movers)
+            self.__shield(structures, movers_by_tile)
+            self.__attack(structures, movers, movers_by_tile, result)
+
+            for index, unit in list(structures.items()):
+                if unit.health <= 0:
+                    del structures[index]
+                    self.game_map.remove_unit([unit.x, unit.y])
+                    result.destroyed.append(unit)
+                    repath = True
+            movers = [mover for mover in movers if mover.unit.health > 0]
+        return result
+
+    def __make_mover(self, unit):
+        target_edge = self.game_state.get_target_edge([unit.x, unit.y])
+        frames_per_move = max(1, int(round(1 / unit.speed))) if unit.speed > 0 else self.MAX_FRAMES
+        return _Mover(unit, target_edge, self.game_map.get_edge_locations(target_edge), frames_per_move)
+
+    def __repath(self, movers):
+        by_edge = {}
+        for mover in movers:
+            by_edge.setdefault(mover.target_edge, []).append(mover)
+        for target_edge, edge_movers in by_edge.items():
+            end_points = self.game_map.get_edge_locations(target_edge)
+            paths = self._finder.navigate_multiple_starts([[mover.unit.x, mover.unit.y] for mover in edge_movers], end_points, self)
+            for mover, path in zip(edge_movers, paths):
+                mover.path = path if path is not None else [[mover.unit.x, mover.unit.y]]
+                mover.step = 0
+
+    def __move(self, movers, structures, result):
+        remaining = []
+        for mover in movers:
+            mover.frames_until_move -= 1
+            if mover.frames_until_move > 0:
+                remaining.append(mover)
+                continue
+            mover.frames_until_move = mover.frames_per_move
+
+            unit = mover.unit
+            if mover.step + 1 < len(mover.path):
+                mover.step += 1
+                mover.steps_taken += 1
+                unit.x, unit.y = mover.path[mover.step]
+                if arena.tile_index(unit.x, unit.y) in mover.end_indices:
+                    self.__breach(mover, result)
+                    continue
+                remaining.append(mover)
+            else:
+                self.__self_destruct(mover, structures, movers, result)
+        return remaining
+
+    def __breach(self, mover, result):
+        unit = mover.unit
+        type_config = self._type_config[unit.unit_type]
+        enemy = 1 - unit.player_index
+        result.health[enemy] -= type_config.get("playerBreachDamage", 1)
+        result.breaches[unit.player_index] += 1
+        result.cores_gained[unit.player_index] += type_config.get("metalForBreach", 0)
+
+    def __self_destruct(self, mover, structures, movers, result):
+        unit = mover.unit
+        type_config = self._type_config[unit.unit_type]
+        if mover.steps_taken < type_config.get("selfDestructStepsRequired", 0):
+            return
+        damage_walker = type_config.get("selfDestructDamageWalker", 0)
+        damage_tower = type_config.get("selfDestructDamageTower", 0)
+        covered = set(arena.tile_index(x, y) for x, y in
+                      arena.locations_in_range(unit.x, unit.y, type_config.get("selfDestructRange", 0), self._get_hit_radius))
+        for index in covered:
+            target = structures.get(index)
+            if target is not None and target.player_index != unit.player_index and target.health > 0:
+                result.damage_dealt[unit.player_index] += min(damage_tower, target.health)
+                target.health -= damage_tower
+        for other in movers:
+            target = other.unit
+            if target.player_index != unit.player_index and target.health > 0 and arena.tile_index(target.x, target.y) in covered:
+                result.damage_dealt[unit.player_index] += min(damage_walker, target.health)
+                target.health -= damage_walker
+
+    def __shield_decay(self, encryptor):
+        type_config = self._type_config[encryptor.unit_type]
+        decay = type_config.get("shieldDecay", self._default_shield_decay)
+        if encryptor.upgraded:
+            decay = type_config.get("upgrade", {}).get("shieldDecay", decay)
+        return decay
+
+    def __decay_shields(self, movers):
+        for mover in movers:
+            if not mover.shields:
+                continue
+            lost = 0
+            for shield in mover.shields:
+                decay = min(shield[0], shield[1])
+                shield[0] -= decay
+                lost += decay
+            mover.shields = [shield for shield in mover.shields if shield[0] > 0]
+            unit = mover.unit
+            unit.health -= min(lost, max(0, unit.health - unit.max_health))
+
+    def __shield(self, structures, movers_by_tile):
+        for index, encryptor in structures.items():
+            if encryptor.shieldPerUnit <= 0 or encryptor.shieldRange <= 0:
+                continue
+            row = encryptor.y if encryptor.player_index == 0 else arena.ARENA_SIZE - 1 - encryptor.y
+            amount = encryptor.shieldPerUnit + self._type_config[encryptor.unit_type].get("shieldBonusPerY", 0) * row
+            decay = self.__shield_decay(encryptor)
+            for x, y in arena.locations_in_range(encryptor.x, encryptor.y, encryptor.shieldRange, self._get_hit_radius):
+                for mover in movers_by_tile.get(arena.tile_index(x, y), ()):
+                    if mover.unit.player_index == encryptor.player_index and index not in mover.shielded_by:
+                        mover.shielded_by.add(index)
+                        mover.unit.health += amount
+                        if decay > 0:
+                            mover.shields.append([amount, decay])
+
+    def __attack(self, structures, movers, movers_by_tile, result):
+        attackers = [mover.unit for mover in movers] + [unit for unit in structures.values() if unit.damage_i + unit.damage_f > 0]
+        for attacker in attackers:
+            if attacker.health <= 0 or attacker.damage_i + attacker.damage_f <= 0:
+                continue
+            target = self.__choose_target(attacker, structures, movers_by_tile)
+            if target is None:
+                continue
+            damage = attacker.damage_f if target.stationary else attacker.damage_i
+            result.damage_dealt[attacker.player_index] += min(damage, target.health)
+            target.health -= damage
+
+    def __choose_target(self, attacker, structures, movers_by_tile):
+        """Picks a target with the priority used by GameState.get_target:
+        Infantry > Nearest Unit > Lowest Health > Lowest Y position > Closest to edge
+        """
+        best = None
+        best_key = None
+        for x, y in arena.locations_in_range(attacker.x, attacker.y, attacker.attackRange, self._get_hit_radius):
+            index = arena.tile_index(x, y)
+            candidates = [mover.unit for mover in movers_by_tile.get(index, ())]
+            if index in structures:
+                candidates.append(structures[index])
+            for unit in candidates:
+                if unit.player_index == attacker.player_index or unit.health <= 0:
+                    continue
+                if (unit.stationary and attacker.damage_f == 0) or (not unit.stationary and attacker.damage_i == 0):
+                    continue
+                distance = math.sqrt((unit.x - attacker.x) ** 2 + (unit.y - attacker.y) ** 2)
+                height = unit.y if attacker.player_index == 0 else -unit.y
+                key = (unit.stationary, distance, unit.health, height, -abs(arena.HALF_ARENA - 0.5 - unit.x))
+                if best_key is None or key < best_key:
+                    best = unit
+                    best_key = key
+        return best
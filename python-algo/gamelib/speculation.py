@@ -0,0 +1,175 @@
+import threading
+
+from . import arena
+from .action_frame import has_events
+from .game_state import GameState
+from .util import debug_write, decode_message
+
+
+def board_key(game_state):
+    """A hashable description of the structures that will still be standing next turn
+
+    Args:
+        game_state: The GameState to describe
+
+    Returns:
+        A frozenset of (player_index, unit_type, x, y, upgraded) for every stationary unit not flagged for removal
+    """
+    key = []
+    game_map = game_state.game_map
+    for index in arena.ARENA_TILES:
+        x, y = arena.LOCATIONS[index]
+        for unit in game_map[x, y]:
+            if unit.stationary and not unit.pending_removal:
+                key.append((unit.player_index, unit.unit_type, x, y, unit.upgraded))
+    return frozenset(key)
+
+
+class SpeculativePlanner:
+    """Plans the next turn in a background thread while the action phase is still running.
+
+    Set it as speculative_planner on your algo and AlgoCore passes it every action frame, or call observe yourself.
+    A worker thread builds the board the next turn is expected to start with from the latest frame: 
+    the structures in the frame, without information units and without structures flagged for removal.
+    It runs plan on that predicted GameState and caches the result under the board_key of the prediction.
+    In on_turn, lookup returns the cached result if the actual board matches a prediction, so the plan does not have to be run again.
+    lookup never waits for the worker: if no matching plan is ready it runs plan on the actual state itself.
+
+    Only frames with deaths, and the first frame after each lookup, can change the board, so the rest are ignored.
+    Resources in the predicted state are the ones in the frame, so plan should only depend on the board.
+    The worker is a thread, not a process, so plan holds the GIL while it runs. It only helps while the main thread is idle,
+    waiting for the next frame, and a speculation still running when the turn starts slows on_turn down until it finishes.
+    lookup drops any frame that is queued but not started, so at most one speculation overlaps on_turn.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * plan (callable): Takes a GameState and returns a result to cache, for example a list of locations to build on
+        * hits (int): The number of lookups that found a cached plan
+        * misses (int): The number of lookups that did not
+
+    """
+    def __init__(self, config, plan):
+        """ Starts the worker thread
+
+        Args:
+            * config (JSON): Contains information about the game
+            * plan (callable): Takes a GameState and returns the plan for it
+
+        """
+        self.config = config
+        self.plan = plan
+        self.hits = 0
+        self.misses = 0
+        self._mobile_indices = [i for i, unit_info in enumerate(config["unitInformation"]) if unit_info.get("unitCategory") == 1]
+        self._cache = {}
+        self._pending = None
+        self._running = False
+        self._first_frame = True
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self.__work, daemon=True)
+        self._worker.start()
+
+    def observe(self, frame):
+        """Queues an action frame for speculation, replacing any frame that has not been started yet
+
+        Args:
+            frame: The action frame as received by on_action_frame, a json string or a dict
+        """
+        if self._stopped or not self._first_frame and isinstance(frame, str) and not has_events(frame, ["death"]):
+            return
+        self._first_frame = False
+        with self._condition:
+            if self._stopped:
+                return
+            self._pending = frame
+            self._condition.notify_all()
+
+    def lookup(self, game_state, compute=True):
+        """Gets the plan for the board of game_state without waiting for the worker. The cache is cleared afterwards.
+
+        Args:
+            game_state: The GameState of the turn that just started
+            compute: If True, runs plan on game_state when no finished speculation matches its board
+
+        Returns:
+            The cached result of plan, else the result of running it now, or None if compute is False
+        """
+        key = board_key(game_state)
+        with self._condition:
+            self._pending = None
+            result = self._cache.get(key)
+            found = key in self._cache
+            self._cache.clear()
+            self._first_frame = True
+        if found:
+            self.hits += 1
+            return result
+        self.misses += 1
+        return self.plan(game_state) if compute else None
+
+    def wait(self, timeout=None):
+        """Waits until the worker has finished every frame observed so far
+
+        Args:
+            timeout: The most seconds to wait, forever if None
+
+        Returns:
+            True if the worker is idle, False if the timeout ran out first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._stopped or not (self._running or self._pending is not None), timeout)
+
+    def stop(self):
+        """Stops the worker thread. Frames observed afterwards are ignored
+        """
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            self._condition.notify_all()
+
+    def predict_state(self, frame):
+        """Builds the GameState the next turn is expected to start with from an action frame
+
+        Args:
+            frame: An action frame, a json string or a dict
+
+        Returns:
+            A GameState without information units or structures flagged for removal
+        """
+        state = dict(decode_message(frame))
+        for units_key in ("p1Units", "p2Units"):
+            units = list(state[units_key])
+            for index in self._mobile_indices:
+                units[index] = []
+            state[units_key] = units
+        predicted = GameState(self.config, state)
+        predicted.suppress_warnings(True)
+        for location in list(predicted.game_map):
+            if any(unit.pending_removal for unit in predicted.game_map[location]):
+                predicted.game_map.remove_unit(location)
+        return predicted
+
+    def __work(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                frame = self._pending
+                self._pending = None
+                self._running = True
+            try:
+                predicted = self.predict_state(frame)
+                key = board_key(predicted)
+                if key not in self._cache:
+                    result = self.plan(predicted)
+                    with self._condition:
+                        self._cache[key] = result
+            except Exception as error:
+                debug_write("Speculative planning failed: {}".format(error))
+            finally:
+                with self._condition:
+                    self._running = False
+                    self._condition.notify_all()
@@ -1,7 +1,59 @@
 import unittest
+import collections
+import copy
+import importlib
 import json
-from .game_state import GameState
-from .unit import GameUnit
+import pickle
+import queue
+import random
+import threading
+from unittest import mock
+from .action_frame import ActionFrame, state_type, has_events
+from .algocore import AlgoCore
+from .game_state import GameState, is_stationary, set_default_rules
+from .unit import GameUnit, unit_stats
+from .navigation import ShortestPathFinder
+from .threat_map import ThreatMap
+from .path_cache import PathCache
+from .turn_clock import TurnClock
+from .simulator import ActionSimulator
+from .rules import RuleSet
+from .parallel import PlanEvaluator, StateSnapshot, simulated_damage
+from .speculation import SpeculativePlanner, board_key
+from . import arena
+from ._reference import SEASON_CONFIG, EMPTY_TURN, ReferencePathFinder, make_season_state, make_random_board
+
+
+def make_frame(state_type, turn_string=EMPTY_TURN):
+    """An engine message with the given turnInfo state type, 0 for a turn, 1 for an action frame and 2 for the end of the game"""
+    state = json.loads(turn_string)
+    state["turnInfo"][0] = state_type
+    return json.dumps(state)
+
+
+def run_algo(algo, messages):
+    """Feeds the config and then messages to AlgoCore.start, ending the game after the last one"""
+    config = json.dumps(dict(json.loads(SEASON_CONFIG), replaySave=1))
+    lines = iter([config] + list(messages) + [make_frame(2)])
+    with mock.patch("gamelib.algocore.get_command", lambda: next(lines)), mock.patch("gamelib.algocore.debug_write"):
+        algo.start()
+
+
+class RecordingAlgo(AlgoCore):
+    """An algo that keeps every message its handlers are passed"""
+
+    def __init__(self):
+        super().__init__()
+        self.turns = []
+        self.frames = []
+
+    def on_turn(self, turn_state):
+        self.turns.append(turn_state)
+
+    def on_action_frame(self, frame):
+        self.frames.append(frame)
+
+
 
 class BasicTests(unittest.TestCase):
 
@@ -232,3 +284,928 @@ class BasicTests(unittest.TestCase):
         actual = game.project_future_bits(turns)
         self.assertAlmostEqual(actual, expected, 0, "Expected {} bits {} turns from now, got {}".format(expected, turns, actual))
 
+
+class PathfindingTests(unittest.TestCase):
+
+    def assert_same_paths(self, game, finder, samples=30):
+        reference = ReferencePathFinder()
+        edges = game.game_map.get_edges()
+        # GameMap is its own iterator, so take a copy before the pathfinder walks it again
+        open_locations = [location for location in list(game.game_map) if not game.contains_stationary_unit(location)]
+        for start in random.Random(samples).sample(open_locations, min(samples, len(open_locations))):
+            for end_points in edges:
+                expected = reference.navigate_multiple_endpoints(start, end_points, game)
+                got = finder.navigate_multiple_endpoints(start, end_points, game)
+                self.assertEqual(expected, got, "Path from {} to {} differs from the reference".format(start, end_points[0]))
+
+    def test_empty_board_matches_reference(self):
+        game = make_season_state()
+        self.assert_same_paths(game, ShortestPathFinder())
+
+    def test_random_boards_match_reference(self):
+        finder = ShortestPathFinder()
+        for seed in range(4):
+            game = make_random_board(seed, density=0.15 + 0.1 * seed)
+            # Reusing one finder across boards checks that no state leaks between searches
+            self.assert_same_paths(game, finder)
+
+    def test_stationary_mask_tracks_board(self):
+        turn = EMPTY_TURN.replace('"p2Units":[[],[],[]', '"p2Units":[[[3,14,6.0,"1"]],[],[]')
+        game = make_season_state(turn)
+        self.assertEqual(1 << (3 * 28 + 14), game.game_map.stationary_mask, "Parsed firewall is missing from the mask")
+        game.attempt_spawn("DF", [13, 6])
+        game.attempt_spawn("PI", [13, 0])
+        self.assertTrue(game.game_map.stationary_mask & (1 << (13 * 28 + 6)), "Spawned firewall is missing from the mask")
+        self.assertFalse(game.game_map.stationary_mask & (1 << 13 * 28), "Mobile units should not block")
+        game.game_map.remove_unit([3, 14])
+        game.game_map.remove_unit([13, 6])
+        self.assertEqual(0, game.game_map.stationary_mask, "Removed firewalls are still in the mask")
+
+    def test_path_follows_board_changes(self):
+        game = make_season_state()
+        finder = ShortestPathFinder()
+        reference = ReferencePathFinder()
+        end_points = game.game_map.get_edge_locations(game.game_map.TOP_RIGHT)
+        for x in range(5, 23):
+            game.game_map.add_unit("FF", [x, 12])
+            self.assertEqual(reference.navigate_multiple_endpoints([13, 0], end_points, game),
+                             finder.navigate_multiple_endpoints([13, 0], end_points, game))
+        game.game_map.remove_unit([9, 12])
+        self.assertEqual(reference.navigate_multiple_endpoints([13, 0], end_points, game),
+                         finder.navigate_multiple_endpoints([13, 0], end_points, game))
+
+    def test_dynamic_mode_matches_full_search(self):
+        finder = ShortestPathFinder(dynamic=True)
+        for seed in range(4):
+            game = make_random_board(seed, density=0.15 + 0.1 * seed)
+            rng = random.Random(seed)
+            locations = list(game.game_map)
+            edges = game.game_map.get_edges()
+            for _ in range(60):
+                for location in rng.sample(locations, rng.choice([1, 1, 2])):
+                    if game.contains_stationary_unit(location):
+                        game.game_map.remove_unit(location)
+                    else:
+                        game.game_map.add_unit("FF", location)
+                start = rng.choice([location for location in locations if not game.contains_stationary_unit(location)][:5])
+                end_points = edges[seed]
+                self.assertEqual(ReferencePathFinder().navigate_multiple_endpoints(start, end_points, game),
+                                 finder.navigate_multiple_endpoints(start, end_points, game))
+        self.assertGreater(finder.repairs, finder.searches)
+
+    def test_dynamic_what_if_repairs(self):
+        game = make_season_state()
+        finder = ShortestPathFinder(dynamic=True)
+        end_points = game.game_map.get_edge_locations(game.game_map.TOP_RIGHT)
+        open_path = finder.navigate_multiple_endpoints([13, 0], end_points, game)
+        for location in open_path[1:6]:
+            game.game_map.add_unit("FF", location)
+            self.assertNotIn(location, finder.navigate_multiple_endpoints([13, 0], end_points, game))
+            game.game_map.remove_unit(location)
+        self.assertEqual(open_path, finder.navigate_multiple_endpoints([13, 0], end_points, game))
+        self.assertEqual((1, 10), (finder.searches, finder.repairs))
+
+    def test_batch_matches_single_queries(self):
+        for seed in range(3):
+            game = make_random_board(seed, density=0.3)
+            starts = list(game.game_map)
+            batch = game.find_paths_to_edge_batch(starts)
+            for start, path in zip(starts, batch):
+                if game.contains_stationary_unit(start):
+                    self.assertIsNone(path)
+                else:
+                    self.assertEqual(ReferencePathFinder().navigate_multiple_endpoints(
+                        start, game.game_map.get_edge_locations(game.get_target_edge(start)), game), path)
+
+
+class ArenaTests(unittest.TestCase):
+
+    def test_bounds_table(self):
+        game = make_season_state()
+        inside = 0
+        for x in range(-2, 30):
+            for y in range(-2, 30):
+                expected = 0 <= y < 14 and 13 - y <= x <= 14 + y or 14 <= y < 28 and y - 14 <= x <= 41 - y
+                self.assertEqual(expected, game.game_map.in_arena_bounds([x, y]), "Bounds are wrong at {}".format([x, y]))
+                inside += expected
+        self.assertEqual(inside, len(list(game.game_map)), "GameMap should iterate every tile in the arena once")
+
+    def test_neighbors_are_symmetric_and_in_bounds(self):
+        for index in arena.ARENA_TILES:
+            for neighbor in arena.NEIGHBORS[index]:
+                self.assertTrue(arena.IN_BOUNDS[neighbor])
+                self.assertIn(index, arena.NEIGHBORS[neighbor])
+
+    def test_locations_in_range_match_brute_force(self):
+        game = make_season_state()
+        for location in [[13, 0], [0, 13], [13, 13], [20, 20], [27, 14]]:
+            for radius in [0, 1.5, 3.5, 4.5, 7]:
+                expected = [[x, y] for x in range(location[0] - 7, location[0] + 8) for y in range(location[1] - 7, location[1] + 8)
+                            if game.game_map.in_arena_bounds([x, y]) and game.game_map.distance_between_locations(location, [x, y]) < radius + 0.01]
+                self.assertEqual(expected, game.game_map.get_locations_in_range(location, radius))
+
+    def test_locations_in_range_are_fresh_lists(self):
+        game = make_season_state()
+        expected = game.game_map.get_locations_in_range([13, 13], 3.5)
+        locations = game.game_map.get_locations_in_range([13, 13], 3.5)
+        locations[0][0] = 99
+        locations.pop()
+        self.assertEqual(expected, game.game_map.get_locations_in_range([13, 13], 3.5), "Changing a result must not change the cache")
+
+
+class ThreatMapTests(unittest.TestCase):
+
+    def test_damage_in_range(self):
+        game = make_season_state()
+        game.game_map.add_unit("DF", [13, 16], 1)
+        game.game_map.add_unit("FF", [14, 16], 1)
+        threat_map = game.get_threat_map()
+        self.assertEqual(16, threat_map.damage_to_walker([13, 13], 0), "One destructor should be in range")
+        self.assertEqual(0, threat_map.damage_to_walker([13, 12], 0), "Nothing should be in range")
+        self.assertEqual(0, threat_map.damage_to_walker([13, 13], 1), "Destructors do not attack their own side")
+        self.assertEqual(0, threat_map.damage_to_structure([13, 13], 0), "Destructors do not attack firewalls")
+        self.assertEqual(48, threat_map.path_damage([[13, 12], [13, 13], [13, 14], [13, 15]], 0))
+
+    def test_incremental_updates_match_rebuild(self):
+        game = make_season_state()
+        threat_map = game.get_threat_map()
+        game.attempt_spawn("DF", [[13, 11], [3, 11]])
+        game.attempt_upgrade([13, 11])
+        self.assertEqual(32, threat_map.damage_to_walker([13, 13], 1), "Upgraded damage should be used")
+        rebuilt = ThreatMap(game.game_map)
+        self.assertEqual(rebuilt.walker_damage, threat_map.walker_damage)
+        self.assertEqual(rebuilt.structure_damage, threat_map.structure_damage)
+
+    def test_get_attackers(self):
+        game = make_season_state()
+        self.assertEqual([], game.get_attackers([13,13], 0), "Are we being attacked by a ghost?")
+        game.game_map.add_unit("DF", [12,12], 0)
+        self.assertEqual([], game.get_attackers([13,13], 0), "Are we being attacked by a friend?")
+        game.game_map.add_unit("EF", [13,12], 1)
+        self.assertEqual([], game.get_attackers([13,13], 0), "Are we being attacked by an encryptor?")
+        game.game_map.add_unit("FF", [14,12], 1)
+        self.assertEqual([], game.get_attackers([13,13], 0), "Are we being attacked by a filter?")
+        game.game_map.add_unit("DF", [12,14], 1)
+        self.assertEqual(1, len(game.get_attackers([13,13], 0)), "We should be in danger")
+        game.game_map.add_unit("DF", [13,14], 1)
+        game.game_map.add_unit("DF", [14,14], 1)
+        self.assertEqual(3, len(game.get_attackers([13,13], 0)), "We should be in danger from 3 places")
+        self.assertEqual(0, len(game.get_attackers([13,8], 0)), "Destructors 6 tiles away are out of range")
+        game.game_map.remove_unit([13,14])
+        self.assertEqual(2, len(game.get_attackers([13,13], 0)), "Removed destructors should not attack")
+
+
+class SimulatorTests(unittest.TestCase):
+
+    def test_undefended_breaches(self):
+        game = make_season_state()
+        result = ActionSimulator(game).simulate([("PI", [13, 0], 5, 0)])
+        self.assertEqual([5, 0], result.breaches, "Every ping should score on an empty board")
+        self.assertEqual([30, 25], result.health)
+        self.assertEqual([5, 0], result.cores_gained)
+
+    def test_blocked_units_self_destruct(self):
+        game = make_season_state()
+        for location in game.game_map.get_edge_locations(game.game_map.TOP_RIGHT) + game.game_map.get_edge_locations(game.game_map.TOP_LEFT):
+            game.game_map.add_unit("FF", location, 1)
+        game.game_map.add_unit("FF", [13, 26], 1)
+        game.game_map.add_unit("FF", [14, 26], 1)
+        result = ActionSimulator(game).simulate([("PI", [13, 0], 1, 0)])
+        self.assertEqual([0, 0], result.breaches, "Nobody can reach a walled off edge")
+        self.assertTrue(result.destroyed, "The ping should self destruct into the walls")
+
+    def test_simulation_does_not_change_state(self):
+        game = make_season_state()
+        game.game_map.add_unit("DF", [25, 15], 1)
+        game.attempt_spawn("PI", [13, 0], 3)
+        result = ActionSimulator(game).simulate()
+        self.assertEqual(3, len(game.game_map[13, 0]), "The simulated pings should not have moved on the real map")
+        self.assertEqual(75, game.game_map[25, 15][0].health, "The destructor on the real map should not be damaged")
+        self.assertLess(sum(result.breaches), 3, "The destructor should stop some pings")
+
+    def test_shields_decay(self):
+        absorbed = []
+        for decay in (0.0, 1.0):
+            config = json.loads(SEASON_CONFIG)
+            config["unitInformation"][1].update(shieldPerUnit=20.0, shieldBonusPerY=0.0, shieldDecay=decay)
+            game = GameState(config, EMPTY_TURN)
+            game.game_map.add_unit("EF", [13, 2], 0)
+            game.game_map.add_unit("DF", [25, 15], 1)
+            absorbed.append(ActionSimulator(game).simulate([("PI", [13, 0], 1, 0)]).damage_dealt[1])
+        self.assertEqual([35, 15], absorbed, "A shield that decayed on the way should not absorb any damage")
+
+
+class ForkTests(unittest.TestCase):
+
+    def test_fork_is_independent(self):
+        game = make_season_state()
+        game.attempt_spawn("DF", [13, 11])
+        child = game.fork()
+        self.assertIs(game.config, child.config, "The config should be shared")
+        self.assertIs(game.game_map[3, 10], child.game_map[3, 10], "Unchanged locations should be shared")
+
+        child.attempt_spawn("FF", [3, 10])
+        child.attempt_spawn("PI", [13, 0], 2)
+        child.attempt_upgrade([13, 11])
+        self.assertEqual([], game.game_map[3, 10], "The parent map should not see the child's spawns")
+        self.assertEqual([], game.game_map[13, 0])
+        self.assertFalse(game.game_map[13, 11][0].upgraded, "The parent's unit should not be upgraded")
+        self.assertTrue(child.game_map[13, 11][0].upgraded)
+        self.assertEqual(game.game_map.stationary_mask | (1 << arena.tile_index(3, 10)), child.game_map.stationary_mask)
+        self.assertEqual([("DF", 13, 11)], game._build_stack)
+        self.assertEqual(3, len(child._build_stack))
+        self.assertLess(child.get_resource(game.CORES), game.get_resource(game.CORES))
+
+    def test_parent_changes_do_not_leak(self):
+        game = make_season_state()
+        game.attempt_spawn("DF", [13, 11])
+        child = game.fork()
+        game.attempt_upgrade([13, 11])
+        game.attempt_spawn("PI", [13, 0])
+        self.assertFalse(child.game_map[13, 11][0].upgraded, "The child's unit should not be upgraded")
+        self.assertEqual([], child.game_map[13, 0])
+
+    def test_forked_threat_map_follows_fork(self):
+        game = make_season_state()
+        game.attempt_spawn("DF", [13, 11])
+        threat_map = game.get_threat_map()
+        child = game.fork()
+        child.game_map.add_unit("DF", [12, 12], 0)
+        child_threat = child.get_threat_map()
+        self.assertIsNot(threat_map, child_threat)
+        self.assertEqual(16, threat_map.damage_to_walker([13, 13], 1))
+        self.assertEqual(32, child_threat.damage_to_walker([13, 13], 1))
+        rebuilt = ThreatMap(child.game_map)
+        self.assertEqual(rebuilt.walker_damage, child_threat.walker_damage)
+
+
+class AlgoCoreTests(unittest.TestCase):
+
+    def test_string_handlers_get_parsed_messages(self):
+        algo = RecordingAlgo()
+        run_algo(algo, [make_frame(0), make_frame(1)])
+        self.assertEqual(1, len(algo.turns))
+        self.assertEqual(1, len(algo.frames))
+        self.assertEqual(make_frame(1), algo.frames[0], "Handlers should still get the raw string")
+        self.assertEqual(1, algo.frames[0].parsed["turnInfo"][0])
+        with mock.patch("gamelib.util.json.loads") as loads:
+            state = GameState(algo.config, algo.turns[0])
+        loads.assert_not_called()
+        self.assertEqual(40, state.get_resource(state.CORES))
+
+    def test_parsed_messages_dispatch(self):
+        algo = RecordingAlgo()
+        algo.parsed_messages = True
+        run_algo(algo, [make_frame(0), make_frame(1)])
+        self.assertEqual(json.loads(make_frame(1)), algo.frames[0])
+        state = GameState(algo.config, algo.turns[0])
+        self.assertEqual(30, state.my_health)
+
+    def test_lazy_frames_dispatch(self):
+        algo = RecordingAlgo()
+        algo.lazy_frames = True
+        run_algo(algo, [make_frame(0), make_frame(1)])
+        self.assertIsInstance(algo.frames[0], ActionFrame)
+        self.assertEqual([], algo.frames[0].events.breach)
+        self.assertNotIsInstance(algo.turns[0], ActionFrame, "Turns are not affected by lazy_frames")
+
+
+    def test_frame_subscription(self):
+        algo = RecordingAlgo()
+        algo.frame_events = ["breach"]
+        breach = json.loads(make_frame(1))
+        breach["events"]["breach"] = [[[13, 0], 1.0, 3, "11", 2]]
+        run_algo(algo, [make_frame(1), json.dumps(breach), make_frame(1)])
+        self.assertEqual(1, len(algo.frames), "Only the frame with a breach should be passed on")
+
+    def test_frames_skipped_without_handler(self):
+        class TurnOnlyAlgo(AlgoCore):
+            def on_turn(self, turn_state):
+                self.turn_state = turn_state
+
+        algo = TurnOnlyAlgo()
+        with mock.patch("gamelib.algocore.json", wraps=json) as algocore_json:
+            run_algo(algo, [make_frame(1), make_frame(0), make_frame(1), make_frame(1)])
+        self.assertEqual(2, algocore_json.loads.call_count, "Only the config and the turn should be decoded")
+
+
+class ActionFrameTests(unittest.TestCase):
+
+    FRAME = """{"p2Units": [[[13, 27, 60.0, "2"]], [], [], [], [], [], [], []], "turnInfo": [1, 3, 12],
+        "p1Stats": [30.0, 4.0, 5.0, 900], "p1Units": [[], [], [[3, 12, 75.0, "7"]], [], [], [], [], []], "p2Stats": [28.0, 5.0, 6.0, 800],
+        "events": {"selfDestruct": [], "breach": [[[13, 0], 1.0, 3, "11", 2]], "damage": [], "shield": [], "move": [],
+        "spawn": [], "death": [], "attack": [], "melee": []}}"""
+
+    def test_fields_match_full_decode(self):
+        frame = ActionFrame(self.FRAME)
+        state = json.loads(self.FRAME)
+        self.assertEqual(state["events"]["breach"], frame.events.breach)
+        self.assertEqual(state["events"]["breach"], frame["events"]["breach"])
+        self.assertEqual(state["p2Units"], frame.p2Units)
+        self.assertEqual(state["turnInfo"], frame.turnInfo)
+        self.assertEqual(state["p1Stats"], frame.p1Stats)
+        self.assertEqual(state["events"], frame.events.to_dict())
+
+    def test_missing_keys(self):
+        frame = ActionFrame(self.FRAME)
+        self.assertIsNone(frame.get("endStats"))
+        with self.assertRaises(AttributeError):
+            frame.endStats
+        with self.assertRaises(KeyError):
+            frame["endStats"]
+
+    def test_keys_only_match_at_their_own_depth(self):
+        frame = ActionFrame(self.FRAME)
+        with self.assertRaises(KeyError):
+            frame["breach"]
+        nested = ActionFrame('{"a": {"b": {"c": 1}, "d": 2}, "e": {"c": 3}, "c": 4}')
+        self.assertEqual(4, nested["c"])
+        self.assertEqual(2, nested.a.d)
+        self.assertIsNone(nested.a.get("c"), "A key of a nested object or a later sibling is not a key of this one")
+        self.assertIsNone(nested.a.get("e"))
+        self.assertEqual(3, nested.e.c)
+
+    def test_raw_prefilters(self):
+        self.assertEqual(1, state_type(self.FRAME))
+        self.assertEqual(0, state_type(make_frame(0)))
+        self.assertIsNone(state_type("{}"))
+        self.assertTrue(has_events(self.FRAME, ["death", "breach"]))
+        self.assertFalse(has_events(self.FRAME, ["death", "damage"]))
+
+
+class FakeClock:
+    """A clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TurnClockTests(unittest.TestCase):
+
+    def test_budget_from_config(self):
+        clock = FakeClock()
+        turn_clock = TurnClock(json.loads(SEASON_CONFIG), safety_margin=0.5, clock=clock)
+        self.assertEqual(5, turn_clock.budget)
+        clock.now += 3
+        self.assertAlmostEqual(2, turn_clock.remaining())
+        self.assertAlmostEqual(1.5, turn_clock.usable())
+        turn_clock.start()
+        self.assertAlmostEqual(5, turn_clock.remaining())
+        clock.now += 4.6
+        self.assertTrue(turn_clock.expired())
+
+    def test_algo_core_starts_clock_on_turn(self):
+        algo = RecordingAlgo()
+        run_algo(algo, [make_frame(0)])
+        self.assertEqual(5, algo.turn_clock.budget)
+        self.assertLess(algo.turn_clock.elapsed(), 5)
+
+    def test_anytime_submits_best_plan_before_deadline(self):
+        clock = FakeClock()
+        turn_clock = TurnClock(json.loads(SEASON_CONFIG), safety_margin=0.5, clock=clock)
+        game = make_season_state()
+        evaluated = []
+
+        def plans():
+            for x in range(13, 28):
+                yield lambda state, x=x: state.attempt_spawn("DF", [x, 13])
+
+        def evaluate(state):
+            clock.now += 1
+            x = state._build_stack[0][1]
+            evaluated.append(x)
+            return -abs(x - 14)
+
+        with mock.patch("gamelib.game_state.send_command") as send:
+            submitted = turn_clock.run_anytime(game, plans(), evaluate)
+        self.assertEqual([13, 14, 15, 16], evaluated, "Plans should stop once one more would pass the safety margin")
+        self.assertEqual([("DF", 14, 13)], submitted._build_stack)
+        self.assertEqual([], game._build_stack, "Plans are tried on forks")
+        send.assert_any_call(json.dumps([("DF", 14, 13)]))
+
+
+class SpeculationTests(unittest.TestCase):
+
+    def frame_with_units(self, p1_units):
+        state = json.loads(make_frame(1))
+        state["p1Units"] = p1_units
+        return json.dumps(state)
+
+    def test_plan_reused_when_board_matches(self):
+        plans = []
+        planner = SpeculativePlanner(json.loads(SEASON_CONFIG), lambda state: plans.append(board_key(state)) or len(plans))
+        self.addCleanup(planner.stop)
+        # A destructor, a filter flagged for removal and a ping that will be gone by the next turn
+        units = [[[3, 12, 6.0, "1"]], [], [[13, 11, 75.0, "2"]], [[13, 0, 15.0, "3"]], [], [], [[3, 12, 0.0, "4"]], []]
+        planner.observe(self.frame_with_units(units))
+        self.assertTrue(planner.wait(timeout=5))
+
+        game = make_season_state()
+        game.game_map.add_unit("DF", [13, 11], 0)
+        self.assertEqual(1, planner.lookup(game), "The plan made for the predicted board should be reused")
+        self.assertEqual([frozenset([(0, "DF", 13, 11, False)])], plans)
+        self.assertEqual(1, planner.hits)
+
+        planner.observe(self.frame_with_units(units))
+        self.assertTrue(planner.wait(timeout=5))
+        self.assertEqual(3, planner.lookup(make_season_state()), "A different board should be planned again")
+        self.assertEqual(frozenset(), plans[-1])
+        self.assertEqual(1, planner.misses)
+        self.assertIsNone(planner.lookup(make_season_state(), compute=False))
+
+    def test_lookup_does_not_wait_for_worker(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_plan(state):
+            if threading.current_thread() is planner._worker:
+                started.set()
+                release.wait(5)
+                return "speculated"
+            return "inline"
+
+        planner = SpeculativePlanner(json.loads(SEASON_CONFIG), slow_plan)
+        self.addCleanup(planner.stop)
+        self.addCleanup(release.set)
+        planner.observe(make_frame(1))
+        self.assertTrue(started.wait(5))
+        self.assertEqual("inline", planner.lookup(make_season_state()), "An unfinished speculation should be computed inline")
+
+    def test_algo_core_feeds_planner(self):
+        algo = RecordingAlgo()
+        algo.speculative_planner = SpeculativePlanner(json.loads(SEASON_CONFIG), lambda state: "plan")
+        self.addCleanup(algo.speculative_planner.stop)
+        run_algo(algo, [make_frame(1)])
+        self.assertTrue(algo.speculative_planner.wait(timeout=5))
+        self.assertEqual("plan", algo.speculative_planner.lookup(make_season_state()))
+        self.assertEqual(1, algo.speculative_planner.hits)
+
+    def test_lookup_after_stop_does_not_wait(self):
+        planner = SpeculativePlanner(json.loads(SEASON_CONFIG), lambda state: "plan")
+        planner.stop()
+        planner.observe(make_frame(1))
+        results = queue.Queue()
+        lookup = threading.Thread(target=lambda: results.put(planner.lookup(make_season_state())), daemon=True)
+        lookup.start()
+        lookup.join(timeout=5)
+        self.assertFalse(lookup.is_alive(), "lookup should not wait for a stopped planner")
+        self.assertEqual("plan", results.get_nowait())
+
+
+def spawned_path_length(game_state, candidate):
+    """A cheap score for the process pool tests, the length of the spawned units' path"""
+    unit_type, location, num = candidate
+    if game_state.attempt_spawn(unit_type, location, num) != num:
+        return -1
+    return len(game_state.find_path_to_edge(location))
+
+
+class PlanEvaluatorTests(unittest.TestCase):
+
+    def test_snapshot_round_trip(self):
+        game = make_random_board(3, density=0.2)
+        game.attempt_upgrade([[x, y] for x, y in list(game.game_map) if y < 14 and game.contains_stationary_unit([x, y])])
+        game.game_map.add_unit("DF", [13, 13], 0)
+        game.attempt_remove([13, 13])
+        game.game_map.add_unit("EI", [14, 0], 0)
+        game.game_map.add_unit("SI", [14, 27], 1)
+        rebuilt = StateSnapshot(game, 1).to_game_state(game.config)
+        self.assertEqual(board_key(game), board_key(rebuilt))
+        self.assertTrue(rebuilt.game_map[13, 13][0].pending_removal)
+        self.assertEqual([("EI", 0)], [(unit.unit_type, unit.player_index) for unit in rebuilt.game_map[14, 0]])
+        self.assertEqual([("SI", 1)], [(unit.unit_type, unit.player_index) for unit in rebuilt.game_map[14, 27]])
+        self.assertEqual(game.game_map.stationary_mask, rebuilt.game_map.stationary_mask)
+        self.assertEqual(game.get_resources(0), rebuilt.get_resources(0))
+
+    def test_snapshot_without_upgrades(self):
+        config = json.loads(SEASON_CONFIG)
+        del config["unitInformation"][7]
+        turn = json.loads(EMPTY_TURN)
+        for units in ("p1Units", "p2Units"):
+            del turn[units][7]
+        game = GameState(config, json.dumps(turn))
+        game.suppress_warnings(True)
+        game.attempt_spawn("DF", [13, 11])
+        game.attempt_remove([13, 11])
+        rebuilt = StateSnapshot(game, 1).to_game_state(config)
+        self.assertEqual(board_key(game), board_key(rebuilt))
+        self.assertTrue(rebuilt.game_map[13, 11][0].pending_removal)
+
+    def test_parallel_scores_match_serial(self):
+        game = make_random_board(4, density=0.2)
+        evaluator = PlanEvaluator(game.config, processes=2)
+        self.addCleanup(evaluator.close)
+        locations = [location for location in game.game_map.get_edge_locations(game.game_map.BOTTOM_LEFT) if not game.contains_stationary_unit(location)]
+        candidates = PlanEvaluator.plan_grid(["PI", "EI"], locations, [1, 3])
+        expected = [spawned_path_length(game.fork(), candidate) for candidate in candidates]
+        self.assertEqual(expected, evaluator.score(game, candidates, spawned_path_length))
+        self.assertEqual([], game._deploy_stack, "Scoring should not spawn on the real state")
+
+        best, score = evaluator.best(make_season_state(), [("PI", [13, 0], 5)])
+        self.assertEqual(("PI", [13, 0], 5), best)
+        self.assertEqual(simulated_damage(make_season_state(), best), score)
+
+
+class UnitStatsTests(unittest.TestCase):
+
+    def test_units_share_stats(self):
+        config = json.loads(SEASON_CONFIG)
+        first = GameUnit("DF", config, 0, None, 3, 12)
+        second = GameUnit("DF", config, 1, 20, 3, 15)
+        self.assertIs(first.stats, second.stats, "Units of a type should share one stats record")
+        self.assertIs(config, first.config)
+        self.assertEqual(75, first.health)
+        self.assertEqual(20, second.health)
+        self.assertEqual(unit_stats(config)["DF"].cost, tuple(first.cost))
+
+    def test_upgrade_swaps_stats(self):
+        config = json.loads(SEASON_CONFIG)
+        unit = GameUnit("DF", config, 0, None, 3, 12)
+        other = GameUnit("DF", config, 0, None, 4, 12)
+        unit.upgrade()
+        self.assertTrue(unit.upgraded)
+        self.assertFalse(other.upgraded, "Upgrading one unit should not change the others")
+        self.assertEqual(32, unit.damage_i)
+        self.assertEqual(16, other.damage_i)
+        self.assertEqual([6, 0], unit.cost, "The upgrade has no cost of its own in this config")
+        unit.upgrade()
+        self.assertEqual(32, unit.damage_i, "Upgrading twice should change nothing")
+        with self.assertRaises(AttributeError):
+            unit.nickname = "Bob"
+
+    def test_stats_can_be_set(self):
+        config = json.loads(SEASON_CONFIG)
+        unit = GameUnit("DF", config, 0, None, 3, 12)
+        other = GameUnit("DF", config, 0, None, 4, 12)
+        unit.upgraded = True
+        self.assertIs(other.stats.upgraded_stats, unit.stats)
+        unit.upgraded = False
+        self.assertIs(other.stats, unit.stats)
+
+        unit.damage_i = 50
+        unit.cost = [1, 2]
+        self.assertEqual((50, [1, 2]), (unit.damage_i, unit.cost))
+        self.assertEqual((16, [6, 0]), (other.damage_i, other.cost), "Setting a stat should not change the others")
+        self.assertEqual(unit_stats(config)["DF"].damage_i, 16)
+        unit.upgrade()
+        self.assertIs(other.stats.upgraded_stats, unit.stats)
+
+
+class RuleSetTests(unittest.TestCase):
+
+    def renamed_config(self):
+        """The season config with every shorthand renamed and stronger destructors"""
+        config = json.loads(SEASON_CONFIG)
+        for unit_info in config["unitInformation"]:
+            unit_info["shorthand"] = "X" + unit_info["shorthand"]
+        config["unitInformation"][2]["attackDamageWalker"] = 20.0
+        config["unitInformation"][2]["cost1"] = 3.0
+        return config
+
+    def test_configs_coexist(self):
+        game = make_season_state()
+        other = GameState(self.renamed_config(), EMPTY_TURN)
+        other.suppress_warnings(True)
+        self.assertEqual(1, game.attempt_spawn("DF", [13, 11]), "Building a second state should not change the first one's unit types")
+        self.assertEqual(1, other.attempt_spawn("XDF", [13, 11]))
+        self.assertFalse(game.attempt_spawn("XDF", [14, 11]), "Unit types of the other config are not valid")
+        self.assertEqual([6, 0], game.type_cost("DF"))
+        self.assertEqual([3, 0], other.type_cost("XDF"))
+        self.assertEqual(16, game.game_map[13, 11][0].damage_i)
+        self.assertEqual(20, other.game_map[13, 11][0].damage_i)
+
+    def test_rules_are_shared_and_immutable(self):
+        config = json.loads(SEASON_CONFIG)
+        rules = RuleSet.for_config(config)
+        self.assertIs(rules, RuleSet.for_config(config))
+        self.assertIs(rules, GameState(config, EMPTY_TURN).rules)
+        self.assertTrue(rules.is_stationary(rules.DESTRUCTOR))
+        self.assertFalse(rules.is_stationary(rules.PING))
+        self.assertEqual(3.5, rules.attack_range("DF"))
+        with self.assertRaises(AttributeError):
+            rules.FILTER = "XX"
+        with self.assertRaises(TypeError):
+            rules.UNIT_TYPE_TO_INDEX["XX"] = 9
+
+    def test_game_state_deepcopies(self):
+        game = make_season_state()
+        game.attempt_spawn("DF", [13, 11])
+        copied = copy.deepcopy(game)
+        self.assertIs(game.rules, copied.rules, "Rules are immutable, so copies share them")
+        copied.game_map.remove_unit([13, 11])
+        self.assertTrue(game.contains_stationary_unit([13, 11]))
+        self.assertEqual(game.rules.unit_stats.keys(), pickle.loads(pickle.dumps(game.rules)).unit_stats.keys())
+
+    def test_is_stationary_without_rules(self):
+        game = make_season_state()
+        self.assertTrue(is_stationary("DF", game.rules))
+        self.addCleanup(set_default_rules, None)
+        set_default_rules(None)
+        with self.assertWarns(DeprecationWarning), self.assertRaises(ValueError):
+            is_stationary("DF")
+        make_season_state()
+        with self.assertWarns(DeprecationWarning), self.assertRaises(ValueError):
+            is_stationary("DF")
+
+        run_algo(RecordingAlgo(), [])
+        with self.assertWarns(DeprecationWarning):
+            self.assertTrue(is_stationary("DF"), "AlgoCore sets the rules of the game's config as the default")
+            self.assertFalse(is_stationary("PI"))
+
+
+class BoardArraysTests(unittest.TestCase):
+
+    def brute_force_count(self, game, region, unit_type, player_index):
+        return sum(1 for x, y in region if arena.in_arena_bounds(x, y) for unit in game.game_map[x, y]
+                   if unit.stationary and unit.unit_type == unit_type and unit.player_index == player_index)
+
+    def test_counts_match_unit_lists(self):
+        game = make_random_board(6, density=0.2)
+        rng = random.Random(6)
+        for x, y in list(game.game_map):
+            if game.game_map[x, y] and rng.random() < 0.3:
+                game.game_map.remove_unit([x, y])
+                game.game_map.add_unit(rng.choice(["EF", "DF"]), [x, y], 0 if y < 14 else 1)
+        arrays = game.game_map.get_arrays()
+        corner = [[x, y] for x in range(0, 8) for y in range(10, 18)]
+        for unit_type in ["FF", "EF", "DF"]:
+            for player_index in range(2):
+                self.assertEqual(self.brute_force_count(game, list(game.game_map), unit_type, player_index),
+                                 arrays.count(unit_type=unit_type, player_index=player_index))
+                self.assertEqual(self.brute_force_count(game, corner, unit_type, player_index),
+                                 arrays.count(corner, unit_type, player_index))
+        self.assertEqual(arena.popcount(game.game_map.stationary_mask), arrays.count())
+
+    def test_arrays_follow_changes(self):
+        game = make_season_state()
+        arrays = game.game_map.get_arrays()
+        game.attempt_spawn("DF", [13, 11])
+        game.attempt_spawn("PI", [13, 0], 3)
+        game.attempt_upgrade([13, 11])
+        index = arena.tile_index(13, 11)
+        self.assertEqual(arrays.unit_types[arrays.unit_type[index]], "DF")
+        self.assertEqual(0, arrays.owner[index])
+        self.assertEqual(75, arrays.health[index])
+        self.assertEqual(1, arrays.upgraded[index])
+        self.assertEqual(3, arrays.mobile_count[0][arena.tile_index(13, 0)])
+        self.assertEqual(3, arrays.count_mobile(player_index=0))
+        self.assertEqual({"FF": 0, "EF": 0, "DF": 1}, arrays.count_by_type(player_index=0))
+        self.assertEqual([[13, 11]], arrays.locations("DF"))
+
+        game.game_map.remove_unit([13, 11])
+        self.assertEqual(-1, arrays.unit_type[index])
+        self.assertEqual(0, arrays.count())
+        self.assertEqual(3, len(game.game_map[13, 0]), "The unit lists stay available")
+
+
+class SnapshotTests(unittest.TestCase):
+
+    def make_turn(self, turn_number, p1_units, p2_units):
+        turn = json.loads(EMPTY_TURN)
+        turn["turnInfo"] = [0, turn_number, -1]
+        for units, placed in (("p1Units", p1_units), ("p2Units", p2_units)):
+            for type_index, x, y, health in placed:
+                turn[units][type_index].append([x, y, health, ""])
+        return make_season_state(json.dumps(turn))
+
+    def test_snapshot_is_read_only_record(self):
+        game = self.make_turn(3, [(2, 13, 11, 60)], [])
+        snapshot = game.snapshot()
+        self.assertEqual(3, snapshot.turn_number)
+        self.assertEqual(((40.0, 5.0), (40.0, 5.0)), snapshot.resources)
+        self.assertEqual(("DF", 0, 60, False), snapshot.unit_at([13, 11]))
+        self.assertIsNone(snapshot.unit_at([13, 12]))
+        self.assertIs(game.rules, snapshot.rules)
+        with self.assertRaises(AttributeError):
+            snapshot.turn_number = 4
+        with self.assertRaises(TypeError):
+            snapshot.unit_type[0] = 1
+
+        game.game_map.remove_unit([13, 11])
+        self.assertEqual(("DF", 0, 60, False), snapshot.unit_at([13, 11]), "Later changes do not reach the snapshot")
+
+    def test_diff(self):
+        previous = self.make_turn(1, [(2, 13, 11, 75), (0, 12, 11, 60), (0, 11, 11, 60)], [(0, 14, 16, 60), (1, 15, 16, 30)])
+        snapshot = previous.snapshot()
+        current = self.make_turn(2, [(2, 13, 11, 75), (7, 13, 11, 0), (0, 12, 11, 40), (0, 10, 11, 60)], [(2, 15, 16, 75)])
+
+        diff = current.diff(snapshot)
+        self.assertEqual([[10, 11], [15, 16]], sorted(diff.built))
+        self.assertEqual([[11, 11], [14, 16], [15, 16]], sorted(diff.destroyed))
+        self.assertEqual([[13, 11]], diff.upgraded)
+        self.assertEqual([[12, 11]], diff.damaged)
+        self.assertEqual({arena.tile_index(12, 11): 20}, diff.health_lost)
+
+        mine = current.diff(snapshot, player_index=0)
+        self.assertEqual([[10, 11]], mine.built)
+        self.assertEqual([[11, 11]], mine.destroyed)
+
+
+class BoardHashTests(unittest.TestCase):
+
+    def test_hash_depends_only_on_board(self):
+        game = make_random_board(7, density=0.2)
+        rebuilt = make_season_state()
+        for location in reversed(list(game.game_map)):
+            for unit in game.game_map[location]:
+                rebuilt.game_map.add_unit(unit.unit_type, location, unit.player_index)
+        self.assertNotEqual(0, game.get_board_hash())
+        self.assertEqual(game.get_board_hash(), rebuilt.get_board_hash())
+
+        before = game.get_board_hash()
+        game.game_map.add_unit("PI", [13, 0])
+        self.assertEqual(before, game.get_board_hash(), "Information units are not part of the board")
+
+    def test_hash_follows_changes(self):
+        game = make_season_state()
+        empty = game.get_board_hash()
+        game.attempt_spawn("DF", [13, 11])
+        spawned = game.get_board_hash()
+        self.assertNotEqual(empty, spawned)
+
+        fork = game.fork()
+        fork.attempt_upgrade([13, 11])
+        upgraded = fork.get_board_hash()
+        self.assertNotEqual(spawned, upgraded)
+        self.assertEqual(spawned, game.get_board_hash(), "Forks hash independently")
+
+        fork.attempt_remove([13, 11])
+        self.assertNotIn(fork.get_board_hash(), (empty, spawned, upgraded))
+        self.assertTrue(fork.game_map[13, 11][0].pending_removal)
+        self.assertFalse(game.game_map[13, 11][0].pending_removal)
+
+        game.game_map.remove_unit([13, 11])
+        self.assertEqual(empty, game.get_board_hash())
+        game.game_map.add_unit("DF", [13, 11], 1)
+        self.assertNotEqual(spawned, game.get_board_hash(), "The owner is part of the hash")
+
+    def test_type_index_beyond_slots_is_rejected(self):
+        last = arena.zobrist_key(0, arena.UNIT_TYPE_SLOTS - 1, 1)
+        self.assertNotEqual(last, arena.zobrist_key(1, 0, 0))
+        with self.assertRaises(ValueError):
+            arena.zobrist_key(0, arena.UNIT_TYPE_SLOTS, 0)
+
+
+class PathCacheTests(unittest.TestCase):
+
+    def test_cached_paths_match_search(self):
+        game = make_random_board(8, density=0.15)
+        cache = PathCache()
+        game.path_cache = cache
+        starts = [location for location in game.game_map.get_edge_locations(game.game_map.BOTTOM_LEFT)
+                  if not game.contains_stationary_unit(location)]
+        first = [game.find_path_to_edge(start) for start in starts]
+        self.assertEqual((0, len(starts)), (cache.hits, cache.misses))
+        second = game.find_paths_to_edge_batch(starts)
+        self.assertEqual(first, second)
+        self.assertEqual(len(starts), cache.hits)
+
+        second[0].append([0, 0])
+        self.assertEqual(first[0], game.find_path_to_edge(starts[0]), "Callers get their own copy")
+
+    def test_board_changes_invalidate(self):
+        game = make_season_state()
+        game.path_cache = PathCache(max_size=2)
+        open_path = game.find_path_to_edge([13, 0])
+        game.game_map.add_unit("FF", open_path[5])
+        blocked_path = game.find_path_to_edge([13, 0])
+        self.assertNotIn(open_path[5], blocked_path)
+        self.assertEqual(0, game.path_cache.hits)
+
+        game.game_map.remove_unit(open_path[5])
+        self.assertEqual(open_path, game.find_path_to_edge([13, 0]))
+        self.assertEqual(1, game.path_cache.hits)
+
+        game.find_path_to_edge([14, 0])
+        game.find_path_to_edge([12, 1])
+        self.assertEqual(2, len(game.path_cache))
+        game.find_path_to_edge([13, 0])
+        self.assertEqual(1, game.path_cache.hits, "The least recently used path was evicted")
+
+
+class OverlayTests(unittest.TestCase):
+
+    def board_state(self, game):
+        return (game.game_map.stationary_mask, game.get_board_hash(), game.get_resources(0), list(game._build_stack),
+                list(game._deploy_stack), [list(game.game_map[location]) for location in list(game.game_map)])
+
+    def test_overlay_is_seen_then_discarded(self):
+        game = make_random_board(9, density=0.1)
+        game.attempt_spawn("DF", [13, 3])
+        arrays = game.game_map.get_arrays()
+        threat = game.get_threat_map()
+        start = [13, 0]
+        path = game.find_path_to_edge(start)
+        before = self.board_state(game)
+        with game.overlay(additions=[("FF", location) for location in path[1:4]] + [("DF", [20, 15])],
+                          removals=[[13, 3]]) as overlaid:
+            self.assertIs(game, overlaid)
+            self.assertNotEqual(path, game.find_path_to_edge(start))
+            self.assertEqual(1, game.game_map[20, 15][0].player_index, "Additions belong to the owner of that half")
+            self.assertEqual([], game.game_map[13, 3])
+            self.assertTrue(game.get_attackers([20, 13], 0))
+            self.assertEqual(3, arrays.count(path[1:4], "FF", 0))
+        self.assertEqual(before, self.board_state(game))
+        self.assertEqual(path, game.find_path_to_edge(start))
+        self.assertEqual([], game.get_attackers([20, 13], 0))
+        self.assertEqual(0, arrays.count(path[1:4], "FF", 0))
+        self.assertEqual(ThreatMap(game.game_map).walker_damage, threat.walker_damage)
+
+    def test_overlay_restores_on_error_and_keeps_forks_apart(self):
+        game = make_season_state()
+        game.attempt_spawn("DF", [13, 11])
+        fork = game.fork()
+        with self.assertRaises(ValueError):
+            with game.overlay(removals=[[13, 11]]):
+                raise ValueError()
+        self.assertTrue(game.contains_stationary_unit([13, 11]))
+        game.attempt_upgrade([13, 11])
+        self.assertTrue(game.game_map[13, 11][0].upgraded)
+        self.assertFalse(fork.game_map[13, 11][0].upgraded, "The restored location is still shared with the fork")
+
+
+class ReferenceEnemyState:
+    """The list scanning EnemyState from before enemy_info used region masks, to check the masks against"""
+
+    def __init__(self, game_state, frontier):
+        self.frontier = frontier
+        self.defence_locs = {}
+        for location in list(game_state.game_map):
+            for unit in game_state.game_map[location]:
+                if location[1] >= 14 and unit.player_index == 1 and unit.stationary:
+                    self.defence_locs.setdefault(unit.unit_type, []).append(location)
+
+    def detect_def_units(self, target_area, unit_type=None):
+        rtn = {}
+        for type, locs in self.defence_locs.items():
+            if unit_type is None or unit_type == type:
+                rtn[type] = sum(1 for loc in locs if loc in target_area)
+        return rtn, sum(rtn.values()), len(target_area)
+
+    def detect_frontier(self, unit_type):
+        total_counts = 0
+        count = 0
+        row_counts = {i: 0 for i in range(14, 19)}
+        for type, locs in self.defence_locs.items():
+            for point in locs:
+                if point in self.frontier:
+                    total_counts += 1
+                    if type == unit_type:
+                        count += 1
+                        row_counts[point[1]] += 1
+        return total_counts, count, collections.Counter(row_counts).most_common(1)[0]
+
+
+class EnemyInfoTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # enemy_info lives next to the algo rather than in gamelib
+        cls.enemy_info = importlib.import_module("enemy_info")
+
+    def mixed_board(self, seed):
+        game = make_random_board(seed, density=0.25)
+        rng = random.Random(seed)
+        for x, y in list(game.game_map):
+            if game.game_map[x, y] and rng.random() < 0.4:
+                game.game_map.remove_unit([x, y])
+                game.game_map.add_unit(rng.choice(["EF", "DF"]), [x, y], 0 if y < 14 else 1)
+        return game
+
+    def test_masks_match_list_scan(self):
+        enemy_info = self.enemy_info
+        areas = [enemy_info.LEFT_CORNER, enemy_info.RIGHT_CORNER, enemy_info.FRONTIER] + enemy_info.LEFT_EDGES + enemy_info.RIGHT_EDGES
+        with mock.patch("gamelib.debug_write"):
+            for seed in range(5):
+                game = self.mixed_board(seed)
+                state = enemy_info.EnemyState(game)
+                reference = ReferenceEnemyState(game, enemy_info.FRONTIER)
+                state.scan_def_units()
+                self.assertEqual({unit_type: sorted(locs) for unit_type, locs in reference.defence_locs.items()},
+                                 {unit_type: sorted(locs) for unit_type, locs in state.defence_locs.items()})
+                for area in areas:
+                    for unit_type in [None, "FF", "EF", "DF"]:
+                        self.assertEqual(reference.detect_def_units(area, unit_type), state.detect_def_units(area, unit_type))
+                for unit_type in ["FF", "EF", "DF"]:
+                    self.assertEqual(reference.detect_frontier(unit_type), state.detect_frontier(unit_type))
+
+    def test_named_and_registered_regions(self):
+        enemy_info = self.enemy_info
+        game = self.mixed_board(11)
+        state = enemy_info.EnemyState(game)
+        by_list = state.detect_def_units(enemy_info.LEFT_CORNER)
+        self.assertEqual(by_list, state.detect_def_units("left_corner"))
+        self.assertEqual(by_list, state.detect_def_units(enemy_info.REGIONS["left_corner"]))
+        self.assertEqual(state.detect_def_units(enemy_info.LEFT_EDGES[2]), state.detect_def_units("left_edge_2"))
+
+        pocket = [[13, 20], [14, 20], [13, 21], [40, 40]]
+        mask = enemy_info.register_region("test_pocket", pocket)
+        self.addCleanup(enemy_info.REGIONS.pop, "test_pocket")
+        self.assertEqual(arena.region_mask(pocket[:3]), mask, "Locations outside the arena are left out")
+        counts, total, positions = state.detect_def_units("test_pocket")
+        self.assertEqual(ReferenceEnemyState(game, enemy_info.FRONTIER).detect_def_units(pocket)[:2], (counts, total))
+        self.assertEqual(3, positions)
+        with self.assertRaises(KeyError):
+            state.detect_def_units("no_such_region")
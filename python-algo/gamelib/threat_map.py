@@ -0,0 +1,141 @@
+from array import array
+
+from . import arena
+
+
+class ThreatMap:
+    """Per tile damage that each player's stationary units can deal every frame.
+
+    Every armed stationary unit is rasterised over the tiles within its attackRange once, so the damage
+    a unit would take standing on a tile, or along a whole path, is a lookup instead of a range scan.
+    Values are the sum over all structures that can reach the tile, the damage a unit there takes per frame
+    if every one of them targets it. They reflect upgrades, since they are read from the GameUnit.
+
+    It also indexes, for each tile, the structures that can hit it, so the attackers of a location
+    are found in time proportional to their number.
+
+    The threat map follows every change made through GameMap.add_unit and GameMap.remove_unit, 
+    and GameState refreshes it when you upgrade. If you upgrade a GameUnit yourself, call refresh_tile for its location.
+
+    Attributes :
+        * walker_damage (list): walker_damage[player_index][index] is the damage per frame player_index's structures deal to enemy information units on tile index
+        * structure_damage (list): structure_damage[player_index][index] is the damage per frame player_index's structures deal to enemy firewalls on tile index
+
+    """
+    def __init__(self, game_map):
+        """Rasterises every stationary unit on the map
+
+        Args:
+            game_map: The GameMap to build the threat map from
+
+        """
+        self.game_map = game_map
+        self.walker_damage = [array('d', [0.0]) * arena.TILE_COUNT for _ in range(2)]
+        self.structure_damage = [array('d', [0.0]) * arena.TILE_COUNT for _ in range(2)]
+        self.__contributions = {}
+        self.__attackers = [{}, {}]
+        for index in arena.ARENA_TILES:
+            self.refresh_tile(arena.tile_location(index))
+        game_map._add_tile_observer(lambda x, y: self.refresh_tile([x, y]))
+
+    def fork(self, game_map):
+        """Copies the threat map for a fork of its GameMap, without rasterising the structures again
+
+        Args:
+            game_map: The forked GameMap the copy should follow
+
+        Returns:
+            A ThreatMap for game_map
+
+        """
+        child = ThreatMap.__new__(ThreatMap)
+        child.game_map = game_map
+        child.walker_damage = [array('d', damage) for damage in self.walker_damage]
+        child.structure_damage = [array('d', damage) for damage in self.structure_damage]
+        child.__contributions = dict(self.__contributions)
+        child.__attackers = [{index: list(units) for index, units in attackers.items()} for attackers in self.__attackers]
+        game_map._add_tile_observer(lambda x, y: child.refresh_tile([x, y]))
+        return child
+
+    def refresh_tile(self, location):
+        """Brings the threat map up to date with the units currently at a location.
+
+        Args:
+            location: The location whose stationary unit was added, removed or upgraded
+
+        """
+        x, y = location
+        index = arena.tile_index(x, y)
+        old = self.__contributions.pop(index, None)
+        if old is not None:
+            self.__apply(old, -1)
+
+        for unit in self.game_map[x, y]:
+            if unit.stationary and unit.damage_i + unit.damage_f > 0:
+                covered = tuple(arena.tile_index(tx, ty) for tx, ty in
+                                arena.locations_in_range(x, y, unit.attackRange, self.game_map.rules.get_hit_radius))
+                contribution = (unit, unit.player_index, unit.damage_i, unit.damage_f, covered)
+                self.__contributions[index] = contribution
+                self.__apply(contribution, 1)
+
+    def __apply(self, contribution, sign):
+        unit, player_index, damage_i, damage_f, covered = contribution
+        walker_damage = self.walker_damage[player_index]
+        structure_damage = self.structure_damage[player_index]
+        attackers = self.__attackers[player_index]
+        for index in covered:
+            walker_damage[index] += sign * damage_i
+            structure_damage[index] += sign * damage_f
+            if sign > 0:
+                attackers.setdefault(index, []).append(unit)
+            else:
+                attackers[index].remove(unit)
+
+    def damage_to_walker(self, location, player_index):
+        """The damage per frame an information unit would take at a location
+
+        Args:
+            location: The location of the hypothetical unit
+            player_index: The player controlling the unit being attacked, 0 for you 1 for the enemy
+
+        Returns:
+            The summed damage per frame of the enemy structures that can reach the location
+        """
+        return self.walker_damage[1 - player_index][arena.tile_index(location[0], location[1])]
+
+    def damage_to_structure(self, location, player_index):
+        """The damage per frame a firewall would take at a location
+
+        Args:
+            location: The location of the hypothetical firewall
+            player_index: The player controlling the firewall, 0 for you 1 for the enemy
+
+        Returns:
+            The summed damage per frame of the enemy structures that can reach the location
+        """
+        return self.structure_damage[1 - player_index][arena.tile_index(location[0], location[1])]
+
+    def get_attackers(self, location, player_index):
+        """The stationary units that can attack a unit at a location
+
+        Args:
+            location: The location of the hypothetical defender
+            player_index: The player controlling the defender, 0 for you 1 for the enemy
+
+        Returns:
+            A new list of the enemy structures with the location in range
+        """
+        return list(self.__attackers[1 - player_index].get(arena.tile_index(location[0], location[1]), ()))
+
+    def path_damage(self, path, player_index):
+        """Sums damage_to_walker over every location of a path, counting one frame per tile
+
+        Args:
+            path: A list of locations, for example from GameState.find_path_to_edge
+            player_index: The player controlling the units walking the path
+
+        Returns:
+            The total damage per frame along the path
+        """
+        walker_damage = self.walker_damage[1 - player_index]
+        return sum(walker_damage[arena.tile_index(x, y)] for x, y in path)
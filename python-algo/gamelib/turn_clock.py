@@ -0,0 +1,91 @@
+import time
+
+
+class TurnClock:
+    """Keeps track of how much of the turn time limit is left.
+
+    AlgoCore starts its turn_clock as soon as a turn message arrives, so inside on_turn remaining() is the time left
+    before the engine's soft limit, waitTimeBotSoft in the config's timingAndReplay.
+
+    Attributes :
+        * budget (float): The time allowed for a turn, in seconds
+        * safety_margin (float): Seconds kept in reserve for sending the turn, usable() stops this early
+        * started (float): When the current turn started, in seconds of clock()
+
+    """
+    DEFAULT_BUDGET_MS = 5000
+
+    def __init__(self, config=None, safety_margin=0.5, clock=time.perf_counter):
+        """ Reads the time limit from the config
+
+        Args:
+            * config (JSON): Contains information about the game. Without it DEFAULT_BUDGET_MS is used
+            * safety_margin (float): Seconds to keep in reserve
+            * clock (callable): Returns the current time in seconds
+
+        """
+        budget_ms = self.DEFAULT_BUDGET_MS
+        if config is not None:
+            budget_ms = config.get("timingAndReplay", {}).get("waitTimeBotSoft", budget_ms)
+        self.budget = budget_ms / 1000
+        self.safety_margin = safety_margin
+        self._clock = clock
+        self.started = clock()
+
+    def start(self):
+        """Starts timing a new turn
+        """
+        self.started = self._clock()
+
+    def elapsed(self):
+        """Seconds since the turn started
+        """
+        return self._clock() - self.started
+
+    def remaining(self):
+        """Seconds left before the soft time limit, negative once it has passed
+        """
+        return self.budget - self.elapsed()
+
+    def usable(self):
+        """Seconds left to spend before the safety margin, never negative
+        """
+        return max(0.0, self.remaining() - self.safety_margin)
+
+    def expired(self):
+        """True once there is no usable time left
+        """
+        return self.usable() <= 0
+
+    def run_anytime(self, game_state, plans, evaluate):
+        """Tries plans until they run out or time does, then submits the best one.
+
+        Each plan is tried on its own GameState.fork and scored with evaluate, for example by path damage or
+        an ActionSimulator result. A new plan is only started if the usable time left is more than the
+        longest evaluation so far, so plans can be an endless generator that yields better candidates over time.
+
+        Args:
+            * game_state (:obj: GameState): The state for this turn, with anything that every plan shares already spawned
+            * plans: An iterable of callables that take a GameState and make a move on it, for example by calling attempt_spawn
+            * evaluate: A callable that takes the GameState a plan was applied to and returns a score, higher is better
+
+        Returns:
+            The GameState that was submitted. It is game_state itself if no plan could be evaluated in time
+
+        """
+        best_state = game_state
+        best_score = None
+        slowest = 0.0
+        for plan in plans:
+            if self.usable() <= slowest:
+                break
+            before = self._clock()
+            candidate = game_state.fork()
+            plan(candidate)
+            score = evaluate(candidate)
+            slowest = max(slowest, self._clock() - before)
+            if best_score is None or score > best_score:
+                best_state = candidate
+                best_score = score
+        best_state.submit_turn()
+        return best_state
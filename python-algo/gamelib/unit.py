@@ -1,3 +1,6 @@
+from .rules import RuleSet, UnitStats
+
+
 def is_stationary(unit_type, firewall_types):
     """
         Args:
@@ -9,9 +12,33 @@ def is_stationary(unit_type, firewall_types):
     return unit_type in firewall_types
 
 
+def unit_stats(config):
+    """The UnitStats of every unit type in a config, see RuleSet.unit_stats
+
+    Args:
+        config (JSON): Contains information about the game
+
+    Returns:
+        A mapping from unit type to the UnitStats of the base unit
+    """
+    return RuleSet.for_config(config).unit_stats
+
+
+def _stat(name):
+    """A GameUnit property reading a stat from the unit's UnitStats, setting it gives the unit its own changed copy"""
+    def set_stat(unit, value):
+        unit.stats = unit.stats.replace(**{name: value})
+    return property(lambda unit: getattr(unit.stats, name), set_stat)
+
+
 class GameUnit:
     """Holds information about a Unit. 
 
+    The stats that every unit of a type shares are read from a UnitStats record, which the RuleSet of the config
+    builds once, and which upgrade swaps for the upgraded record, so creating a unit only stores its own state.
+    Setting upgraded or config swaps in the matching shared record. Setting any other stat gives the unit its own copy
+    of the record with that stat changed, which lasts until the unit is upgraded or its config is set.
+
     Attributes :
         * unit_type (string): This unit's type
         * config (JSON): Contains information about the game
@@ -30,49 +57,66 @@ class GameUnit:
         * shieldPerUnit (float): how much shield is given per unit
         * pending_removal (boolean): If this unit is marked for removal by its owner
         * upgraded (boolean): If this unit is upgraded
+        * stats (:obj: UnitStats): The shared stats of this unit's type
 
     """
+    __slots__ = ("unit_type", "player_index", "pending_removal", "x", "y", "health", "stats")
+
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
         """ Initialize unit variables using args passed
 
+        Args:
+            * config: The RuleSet of the game, or the config (JSON) it is read from
+
         """
         self.unit_type = unit_type
-        self.config = config
         self.player_index = player_index
         self.pending_removal = False
-        self.upgraded = False
         self.x = x
         self.y = y
-        self.__serialize_type()
-        self.health = self.max_health if not health else health
-
-    def __serialize_type(self):
-        from .game_state import FIREWALL_TYPES, UNIT_TYPE_TO_INDEX, ENCRYPTOR
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]]
-        self.stationary = type_config["unitCategory"] == 0
-        self.speed = type_config.get("speed", 0)
-        self.damage_f = type_config.get("attackDamageTower", 0)
-        self.damage_i = type_config.get("attackDamageWalker", 0)
-        self.attackRange = type_config.get("attackRange", 0)
-        self.shieldRange = type_config.get("shieldRange", 0)
-        self.max_health = type_config.get("startHealth", 0)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
-        self.cost = [type_config.get("cost1", 0), type_config.get("cost2", 0)]
+        rules = config if type(config) is RuleSet else RuleSet.for_config(config)
+        self.stats = rules.unit_stats[unit_type]
+        self.health = self.stats.max_health if not health else health
 
+    @property
+    def config(self):
+        return self.stats.config
 
-    def upgrade(self):
-        from .game_state import UNIT_TYPE_TO_INDEX
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]].get("upgrade", {})
-        self.speed = type_config.get("speed", self.speed)
-        self.damage_f = type_config.get("attackDamageTower", self.damage_f)
-        self.damage_i = type_config.get("attackDamageWalker", self.damage_i)
-        self.attackRange = type_config.get("attackRange", self.attackRange)
-        self.shieldRange = type_config.get("shieldRange", self.shieldRange)
-        self.max_health = type_config.get("startHealth", self.max_health)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", self.shieldPerUnit)
-        self.cost = [type_config.get("cost1", 0) + self.cost[0], type_config.get("cost2", 0) + self.cost[1]]
-        self.upgraded = True
+    @config.setter
+    def config(self, config):
+        stats = RuleSet.for_config(config).unit_stats[self.unit_type]
+        self.stats = stats.upgraded_stats if self.upgraded else stats
+
+    @property
+    def upgraded(self):
+        return self.stats.upgraded
 
+    @upgraded.setter
+    def upgraded(self, upgraded):
+        if upgraded:
+            self.stats = self.stats.upgraded_stats
+        elif self.stats.upgraded:
+            self.stats = RuleSet.for_config(self.stats.config).unit_stats[self.unit_type]
+
+    stationary = _stat("stationary")
+    speed = _stat("speed")
+    damage_f = _stat("damage_f")
+    damage_i = _stat("damage_i")
+    attackRange = _stat("attackRange")
+    shieldRange = _stat("shieldRange")
+    max_health = _stat("max_health")
+    shieldPerUnit = _stat("shieldPerUnit")
+
+    @property
+    def cost(self):
+        return list(self.stats.cost)
+
+    @cost.setter
+    def cost(self, cost):
+        self.stats = self.stats.replace(cost=tuple(cost))
+
+    def upgrade(self):
+        self.stats = self.stats.upgraded_stats
 
     def __toString(self):
         owner = "Friendly" if self.player_index == 0 else "Enemy"
@@ -1,9 +1,42 @@
+import json
 import sys
 
 
 BANNER_TEXT = "---------------- Starting Your Algo --------------------"
 
 
+class EngineMessage(str):
+    """A message received from the game engine, carrying its decoded json so that it is only parsed once.
+    It is still the raw string, so handlers that call json.loads on it keep working.
+
+    Attributes :
+        * parsed (dict): The decoded message
+
+    """
+    def __new__(cls, line, parsed):
+        message = super().__new__(cls, line)
+        message.parsed = parsed
+        return message
+
+
+def decode_message(message):
+    """Gets the decoded json of an engine message, without parsing it again if that was already done
+
+    Args:
+        message: A dict, an EngineMessage or a json string
+
+    Returns:
+        The message as a dict
+
+    """
+    if isinstance(message, dict):
+        return message
+    parsed = getattr(message, "parsed", None)
+    if parsed is not None:
+        return parsed
+    return json.loads(message)
+
+
 def get_command():
     """Gets input from stdin
 